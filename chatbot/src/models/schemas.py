@@ -107,6 +107,29 @@ class ChatbotURLResponse(BaseModel):
             }
         }
 
+# deep analysis does whois, dns and page fetches per url, so batches stay small
+MAX_BATCH_URLS = 10
+
+class ChatbotBatchURLRequest(BaseModel):
+    """request model for analyzing several URLs at once"""
+    urls: List[str]
+    session_id: Optional[str] = None
+    
+    @validator('urls')
+    def validate_urls(cls, v):
+        if not v:
+            raise ValueError('At least one URL is required')
+        if len(v) > MAX_BATCH_URLS:
+            raise ValueError(f'At most {MAX_BATCH_URLS} URLs can be analyzed per request')
+        for url in v:
+            if not validators.url(url):
+                raise ValueError(f'Invalid URL format: {url[:50]}')
+        return v
+
+class ChatbotBatchURLResponse(BaseModel):
+    """response model for a batch of URL analyses, in request order"""
+    results: List[ChatbotURLResponse]
+
 class ChatMessage(BaseModel):
     content: str
     is_user: bool
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.responses import JSONResponse
+import asyncio
 import time
 from typing import Dict, Any, List, Optional
 
 from ..logging_config import get_logger
-from ..models.schemas import ChatbotURLRequest, ChatbotURLResponse, ErrorResponse
+from ..models.schemas import ChatbotURLRequest, ChatbotURLResponse, ChatbotBatchURLRequest, ChatbotBatchURLResponse, ErrorResponse
 from ..services.model_service import ModelService
-from ..utils.feature_extraction import FeatureExtractor
 from ..models.schemas import FeedbackRequest
 from ..services.database_integration_service import DatabaseIntegrationService
 from ..config import RATE_LIMIT_PER_MINUTE, DB_SYNC_ENABLED
@@ -23,7 +23,10 @@ request_counters: Dict[str, Dict[str, int]] = {}
 
 async def check_rate_limit(request: Request, limit: int = RATE_LIMIT_PER_MINUTE):
     """rate limiting dependency"""
-    client_ip = request.client.host
+    _count_requests(request.client.host, 1, limit)
+
+def _count_requests(client_ip: str, cost: int, limit: int = RATE_LIMIT_PER_MINUTE):
+    """add cost requests to the client's counter for this minute, 429 past the limit"""
     current_time = int(time.time() / 60)  # current minute
     
     # initialize or clean up old entries
@@ -36,7 +39,7 @@ async def check_rate_limit(request: Request, limit: int = RATE_LIMIT_PER_MINUTE)
         del request_counters[client_ip][minute]
     
     # increment counter
-    request_counters[client_ip][current_time] = request_counters[client_ip].get(current_time, 0) + 1
+    request_counters[client_ip][current_time] = request_counters[client_ip].get(current_time, 0) + cost
     
     # check limit
     if request_counters[client_ip][current_time] > limit:
@@ -72,8 +75,9 @@ async def analyze_url(
         # get model service (singleton)
         model_service = ModelService()
         
-        # get comprehensive analysis
-        response = model_service.predict(url)
+        # get comprehensive analysis - extraction blocks on whois/dns/http, so run it
+        # in a worker thread and keep the event loop free for other requests
+        response = await asyncio.to_thread(model_service.predict, url)
 
         # save to database
         if DB_SYNC_ENABLED:
@@ -92,6 +96,49 @@ async def analyze_url(
         
     except Exception as e:
         logger.error(f"Error analyzing URL: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred during analysis. Please try again later."
+        )
+
+@router.post(
+    "/deep-analyze-urls",
+    response_model=ChatbotBatchURLResponse,
+    responses={
+        status.HTTP_429_TOO_MANY_REQUESTS: {"model": ErrorResponse},
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": ErrorResponse}
+    }
+)
+async def analyze_urls(request_data: ChatbotBatchURLRequest, request: Request):
+    """
+    deep analysis of several URLs, extracted concurrently and scored with one model call
+    """
+    # every url in the batch counts against the client's rate limit
+    _count_requests(request.client.host, len(request_data.urls))
+
+    try:
+        start_time = time.time()
+        logger.info(f"Chatbot batch analysis request received for {len(request_data.urls)} URLs")
+
+        model_service = ModelService()
+        responses = await model_service.predict_batch(request_data.urls)
+
+        # save to database, once per distinct url
+        if DB_SYNC_ENABLED:
+            for response in {r.url: r for r in responses}.values():
+                db_integration.save_url_analysis(response.dict())
+
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Batch analysis completed in {elapsed:.2f}s: "
+            f"{sum(r.is_phishing for r in responses)} of {len(responses)} flagged"
+        )
+
+        return ChatbotBatchURLResponse(results=responses)
+
+    except Exception as e:
+        logger.error(f"Error analyzing URL batch: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An internal error occurred during analysis. Please try again later."
@@ -1,7 +1,11 @@
+import asyncio
 import joblib
 import json
 import numpy as np
 import os
+import threading
+from bisect import bisect_right
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
@@ -9,12 +13,25 @@ from datetime import datetime
 from ..config import CHATBOT_MODEL_PATH, CHATBOT_SCALER_PATH, CHATBOT_FEATURES_PATH, CHATBOT_METADATA_PATH, PHISHING_THRESHOLD_CB, WARNING_THRESHOLD_CB
 from ..logging_config import get_logger
 from ..utils.feature_extraction import FeatureExtractor
+from ..utils.forest import FlatForest
 from ..models.schemas import ChatbotURLResponse, DeepAnalysisResult
 from .redis_service import RedisService
 from .database_integration_service import DatabaseIntegrationService
 
 logger = get_logger(__name__)
 
+# confidence level by threat score: High below 15, Low 15-29, Medium 30-70,
+# Low 71-85, High above 85. CONFIDENCE_BOUNDS holds the first score of each band
+CONFIDENCE_BOUNDS = (15, 30, 71, 86)
+CONFIDENCE_LEVELS = ("High", "Low", "Medium", "Low", "High")
+
+# indicators listed in the explanation of a high-risk url, in order, when their flag is set
+EXPLANATION_INDICATORS = (
+    ('IsTyposquatting', "typosquatting"),
+    ('BrandInSubdomain', "brand impersonation in the subdomain"),
+    ('ultra_high_risk', "ultra-high risk patterns"),
+)
+
 class ModelService:
     """
     service for loading and using the deep analysis ML model for the chatbot
@@ -34,8 +51,18 @@ class ModelService:
         
         self._initialized = True
         self.model = None
+        # flattened copy of the forest used for predict_proba, None falls back to sklearn
+        self.forest = None
         self.scaler = None
+        # StandardScaler parameters, cached so rows can be scaled in place
+        self._scaler_mean = None
+        self._scaler_scale = None
         self.feature_list = []
+        # pulls the feature_list values out of a feature dict in one call
+        self._feature_getter = None
+        # per-thread (1, n_features) input row reused across predict calls,
+        # predictions run concurrently on worker threads
+        self._tls = threading.local()
         self.model_info = {
             "name": "advanced_random_forest_model",
             "type": "random_forest",
@@ -56,11 +83,21 @@ class ModelService:
             # load model
             logger.info(f"Loading chatbot model from {CHATBOT_MODEL_PATH}")
             self.model = joblib.load(CHATBOT_MODEL_PATH)
+            # trained with n_jobs=-1, which makes every sklearn predict_proba call spin up
+            # a thread pool - far more overhead than a handful of rows is worth
+            if hasattr(self.model, 'n_jobs'):
+                self.model.n_jobs = 1
+            self.forest = FlatForest.from_model(self.model)
             
             # load scaler if available
             if os.path.exists(CHATBOT_SCALER_PATH):
                 logger.info(f"Loading scaler from {CHATBOT_SCALER_PATH}")
                 self.scaler = joblib.load(CHATBOT_SCALER_PATH)
+                if (getattr(self.scaler, 'with_mean', False) and getattr(self.scaler, 'with_std', False)
+                        and getattr(self.scaler, 'mean_', None) is not None
+                        and getattr(self.scaler, 'scale_', None) is not None):
+                    self._scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+                    self._scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
             else:
                 logger.warning(f"Scaler not found at {CHATBOT_SCALER_PATH}")
             
@@ -110,6 +147,8 @@ class ModelService:
                         if "version" in metadata:
                             self.model_info["version"] = metadata["version"]
             
+            if len(self.feature_list) > 1:  # a single-key itemgetter returns a bare value
+                self._feature_getter = itemgetter(*self.feature_list)
             logger.info("Chatbot model and related artifacts loaded successfully")
             logger.info(f"Model: {self.model_info}")
             logger.info(f"Features: {len(self.feature_list)}")
@@ -146,12 +185,18 @@ class ModelService:
     
     def _get_deep_analysis(self, url: str, features: Dict[str, Any], raw_probability: float) -> DeepAnalysisResult:
         try:
-            domain, full_domain = FeatureExtractor.get_domain(url)
-            
-            # get domain information
+            # get domain information - feature extraction already ran whois (or
+            # skipped it for a dead domain), so only look it up for external features
             whois_info = None
-            if domain:
-                whois_info = FeatureExtractor.get_domain_info(domain)
+            if 'domain_age_days' in features:
+                whois_info = {
+                    'domain_age': features['domain_age_days'],
+                    'registration_length': features['registration_length_days']
+                }
+            else:
+                domain, full_domain = FeatureExtractor.get_domain(url)
+                if domain:
+                    whois_info = FeatureExtractor.get_domain_info(domain)
             
             # build the DeepAnalysisResult object
             deep_analysis = DeepAnalysisResult(
@@ -228,13 +273,7 @@ class ModelService:
                 explanation += f"It uses {protocol} and has an {domain_age} domain age. "
                 explanation += "Multiple phishing indicators were detected including "
                 
-                indicators = []
-                if features.get('IsTyposquatting', 0) == 1:
-                    indicators.append("typosquatting")
-                if features.get('BrandInSubdomain', 0) == 1:
-                    indicators.append("brand impersonation in the subdomain")
-                if features.get('ultra_high_risk', 0) == 1:
-                    indicators.append("ultra-high risk patterns")
+                indicators = [text for name, text in EXPLANATION_INDICATORS if features.get(name, 0) == 1]
                 if not indicators:
                     indicators.append("suspicious URL patterns")
                 
@@ -268,114 +307,194 @@ class ModelService:
             if features is None:
                 features = FeatureExtractor.extract_features(url)
             
-            logger.info(f"Features extracted for URL: {url[:50]}...")
+            logger.debug("Features extracted for URL: %.50s...", url)
             
             # prepare features for the model
             if self.feature_list:
                 # use feature list to ensure correct order
-                X = FeatureExtractor.prepare_features_for_model(features, self.feature_list)
-                logger.info(f"Prepared feature array shape: {X.shape}")
+                X = self._feature_row(features)
+                logger.debug("Prepared feature array shape: %s", X.shape)
             else:
                 # fallback if feature list is not available
                 X = np.array(list(features.values())).reshape(1, -1)
                 logger.warning("No feature list available, using all features")
             
-            # scale features
-            if self.scaler:
-                X_scaled = self.scaler.transform(X)
-            else:
-                X_scaled = X
-                logger.warning("No scaler available, using raw features")
-            
-            # make prediction
-            raw_prediction = self.model.predict(X_scaled)[0]
-            raw_probability = float(self.model.predict_proba(X_scaled)[0, 1])
-            
-            logger.info(f"Raw model output: prediction={raw_prediction}, probability={raw_probability:.4f}")
-            
-            # ultra-high recall threshold for chatbot safety 
-            phishing_threshold = 0.4  # lower threshold for maximum security
-            warning_threshold = float(WARNING_THRESHOLD_CB) if WARNING_THRESHOLD_CB else 0.3
-            
-            # ultra-sensitive override
-            ultra_sensitive_override = (
-                features.get('UsingIP', 0) == 1 or 
-                features.get('ultra_high_risk', 0) == 1 or
-                features.get('IsTyposquatting', 0) == 1 or
-                features.get('BrandInSubdomain', 0) == 1
-            )
-            
-            # apply the threshold to determine if it's phishing
-            is_phishing = raw_probability >= phishing_threshold or ultra_sensitive_override
-            is_suspicious = raw_probability >= warning_threshold
-            
-            # calculate threat score based on raw probability
-            threat_score = int(raw_probability * 100)
-            
-            # boost threat score for ultra-sensitive cases
-            if ultra_sensitive_override:
-                threat_score = max(threat_score, 85)
-                logger.info("Ultra-sensitive override: Critical phishing indicators detected")
-            
-            # determine confidence level
-            if threat_score > 85 or threat_score < 15:
-                confidence_level = "High"
-            elif 30 <= threat_score <= 70:
-                confidence_level = "Medium"
-            else:
-                confidence_level = "Low"
-            
-            # get features that were analyzed
-            features_analyzed = [
-                "domain_age", "ssl_cert", "url_length", 
-                "special_chars", "typosquatting", "subdomains",
-                "dns_records", "domain_registration", "brand_impersonation",
-                "ultra_comprehensive_analysis"
-            ]
-            
-            # generate deep analysis
-            deep_analysis = self._get_deep_analysis(url, features, raw_probability)
-            
-            # generate recommendations
-            recommendations = self._get_recommendations(is_phishing, threat_score, features)
-            
-            # generate explanation
-            explanation = self._get_explanation(is_phishing, threat_score, features)
-            
-            # build the response
-            response = ChatbotURLResponse(
-                url=url,
-                is_phishing=is_phishing,
-                threat_score=threat_score,
-                probability=raw_probability,
-                analysis_timestamp=datetime.now(),
-                confidence_level=confidence_level,
-                features_analyzed=features_analyzed,
-                model_version=self.model_info['version'],
-                deep_analysis=deep_analysis,
-                recommendations=recommendations,
-                explanation=explanation
-            )
+            raw_probability = float(self._phishing_probabilities(X)[0])
+            logger.debug("Raw model output: probability=%.4f", raw_probability)
 
-            # cache the result if Redis is connected
-            if self.redis.is_connected():
-                self.redis.cache_url_analysis(url, response.dict())
-
-            # track the model evaluation in the database if available
-            if hasattr(self, 'db_integration'):
-                # Track this evaluation
-                self.db_integration.track_model_evaluation({
-                    "model_name": self.model_info["name"],
-                    "url": url,
-                    "is_phishing": is_phishing,
-                    "score": threat_score / 100.0  # Convert to 0-1 range
-                })
-            
-            return response
+            return self._build_response(url, features, raw_probability)
             
         except Exception as e:
             logger.error(f"Error making prediction: {str(e)}", exc_info=True)
             raise
+
+    def predict_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[ChatbotURLResponse]:
+        """score several (url, features) pairs with a single scaler and model call"""
+        if self.model is None:
+            logger.error("Chatbot model not loaded")
+            raise RuntimeError("Model not loaded")
+        if not self.feature_list or len(items) == 1:
+            return [self.predict(url, features) for url, features in items]
+
+        try:
+            X = self._feature_matrix([features for _, features in items])
+            probabilities = self._phishing_probabilities(X)
+            logger.debug("Batched prediction for %d URLs", len(items))
+            return [
+                self._build_response(url, features, float(raw_probability))
+                for (url, features), raw_probability in zip(items, probabilities)
+            ]
+        except Exception as e:
+            logger.error(f"Error making batched prediction: {str(e)}", exc_info=True)
+            raise
+
+    async def predict_batch(self, urls: List[str]) -> List[ChatbotURLResponse]:
+        """
+        deep analysis of several urls - cached ones come from redis, the rest are
+        extracted concurrently and scored together with one model call
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        # redis and the model block, so they run on worker threads like predict
+        responses = await asyncio.to_thread(self._get_cached_responses, unique_urls)
+
+        pending = [url for url in unique_urls if url not in responses]
+        if pending:
+            features = await FeatureExtractor.extract_features_batch(pending)
+            fresh = await asyncio.to_thread(self.predict_many, list(zip(pending, features)))
+            responses.update(zip(pending, fresh))
+
+        return [responses[url] for url in urls]
+
+    def _get_cached_responses(self, urls: List[str]) -> Dict[str, ChatbotURLResponse]:
+        responses = {}
+        if self.redis.is_connected():
+            for url in urls:
+                cached_result = self.redis.get_cached_analysis(url)
+                if cached_result:
+                    responses[url] = ChatbotURLResponse(**cached_result)
+        return responses
+    
+    def _feature_row(self, features: Dict[str, Any]) -> np.ndarray:
+        """single model input row, written into this thread's reusable buffer"""
+        if self._feature_getter is None:
+            return FeatureExtractor.prepare_features_for_model(features, self.feature_list)
+        buf = getattr(self._tls, 'row', None)
+        if buf is None:
+            # float64 like prepare_features_for_model, the scaler was fitted on float64 rows
+            buf = self._tls.row = np.empty((1, len(self.feature_list)), dtype=np.float64)
+        try:
+            buf[0] = self._feature_getter(features)
+        except KeyError:
+            return FeatureExtractor.prepare_features_for_model(features, self.feature_list)
+        return buf
+
+    def _feature_matrix(self, features_batch: List[Dict[str, Any]]) -> np.ndarray:
+        """model input rows in feature_list order, one per feature dict"""
+        if self._feature_getter is not None:
+            try:
+                return np.array([self._feature_getter(features) for features in features_batch], dtype=np.float64)
+            except KeyError:
+                pass  # some dict lacks a feature, fill the gaps with 0 below
+        return FeatureExtractor.prepare_features_batch(features_batch, self.feature_list)
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """standardize model input rows, in place when the scaler parameters are cached"""
+        if self._scaler_mean is None or X.dtype != np.float64 or X.shape[1:] != self._scaler_mean.shape:
+            return self.scaler.transform(X)
+        # the same subtract then divide StandardScaler.transform does, so the
+        # scaled values are identical
+        np.subtract(X, self._scaler_mean, out=X)
+        np.divide(X, self._scaler_scale, out=X)
+        return X
+
+    def _phishing_probabilities(self, X: np.ndarray) -> np.ndarray:
+        """scale model input rows and return the phishing probability of each"""
+        if self.scaler:
+            X_scaled = self._scale(X)
+        else:
+            X_scaled = X
+            logger.warning("No scaler available, using raw features")
+
+        if self.forest is not None:
+            return self.forest.predict_proba(X_scaled)[:, 1]
+        return self.model.predict_proba(X_scaled)[:, 1]
+
+    def _build_response(self, url: str, features: Dict[str, Any], raw_probability: float) -> ChatbotURLResponse:
+        """apply thresholds and overrides to a model probability, then cache and track the response"""
+        # ultra-high recall threshold for chatbot safety 
+        phishing_threshold = 0.4  # lower threshold for maximum security
+        warning_threshold = float(WARNING_THRESHOLD_CB) if WARNING_THRESHOLD_CB else 0.3
+        
+        # ultra-sensitive override
+        ultra_sensitive_override = (
+            features.get('UsingIP', 0) == 1 or 
+            features.get('ultra_high_risk', 0) == 1 or
+            features.get('IsTyposquatting', 0) == 1 or
+            features.get('BrandInSubdomain', 0) == 1
+        )
+        
+        # apply the threshold to determine if it's phishing
+        is_phishing = raw_probability >= phishing_threshold or ultra_sensitive_override
+        is_suspicious = raw_probability >= warning_threshold
+        
+        # calculate threat score based on raw probability
+        threat_score = int(raw_probability * 100)
+        
+        # boost threat score for ultra-sensitive cases
+        if ultra_sensitive_override:
+            threat_score = max(threat_score, 85)
+            logger.debug("Ultra-sensitive override: Critical phishing indicators detected")
+        
+        # determine confidence level
+        confidence_level = CONFIDENCE_LEVELS[bisect_right(CONFIDENCE_BOUNDS, threat_score)]
+        
+        # get features that were analyzed
+        features_analyzed = [
+            "domain_age", "ssl_cert", "url_length", 
+            "special_chars", "typosquatting", "subdomains",
+            "dns_records", "domain_registration", "brand_impersonation",
+            "ultra_comprehensive_analysis"
+        ]
+        
+        # generate deep analysis
+        deep_analysis = self._get_deep_analysis(url, features, raw_probability)
+        
+        # generate recommendations
+        recommendations = self._get_recommendations(is_phishing, threat_score, features)
+        
+        # generate explanation
+        explanation = self._get_explanation(is_phishing, threat_score, features)
+        
+        # build the response
+        response = ChatbotURLResponse(
+            url=url,
+            is_phishing=is_phishing,
+            threat_score=threat_score,
+            probability=raw_probability,
+            analysis_timestamp=datetime.now(),
+            confidence_level=confidence_level,
+            features_analyzed=features_analyzed,
+            model_version=self.model_info['version'],
+            deep_analysis=deep_analysis,
+            recommendations=recommendations,
+            explanation=explanation
+        )
+
+        # cache the result if Redis is connected
+        if self.redis.is_connected():
+            self.redis.cache_url_analysis(url, response.dict())
+
+        # track the model evaluation in the database if available
+        if hasattr(self, 'db_integration'):
+            # Track this evaluation
+            self.db_integration.track_model_evaluation({
+                "model_name": self.model_info["name"],
+                "url": url,
+                "is_phishing": is_phishing,
+                "score": threat_score / 100.0  # Convert to 0-1 range
+            })
+        
+        return response
     
     def process_feedback(self, url: str, feedback_type: str, reported_by: Optional[str] = None) -> bool:
         """process user feedback about an analysis for continuous learning"""
@@ -1,19 +1,23 @@
 import re
+import math
 import time
+import asyncio
 import socket
 import numpy as np
-import math
-from urllib.parse import urlparse
+from urllib.parse import urlparse, quote
 import tldextract
 import whois
 import dns.resolver
 import requests
-from datetime import datetime
-from bs4 import BeautifulSoup
+from datetime import datetime, timezone
+from lxml import etree
 import Levenshtein
-import ssl
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 import ipaddress
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
 
 from ..logging_config import get_logger
 
@@ -21,10 +25,258 @@ logger = get_logger(__name__)
 
 # whitelist for legitimate HTTP URLs
 HTTP_WHITELIST = ['example.com', 'info.cern.ch', 'localhost']
+_HTTP_WHITELIST_SET = frozenset(HTTP_WHITELIST)
+
+# address blocks that must never be requested, parsed once at import
+FORBIDDEN_CIDRS = (
+    '10.0.0.0/8',      # private network
+    '172.16.0.0/12',   # private network
+    '192.168.0.0/16',  # private network
+    '127.0.0.0/8',     # localhost
+    '169.254.0.0/16',  # link-local
+    '192.0.2.0/24',    # test-net
+    '224.0.0.0/4',     # multicast
+    '240.0.0.0/4'      # reserved
+)
+_FORBIDDEN_NETS = tuple(ipaddress.ip_network(cidr) for cidr in FORBIDDEN_CIDRS)
+
+# shared pool for the blocking whois/dns/http lookups so they overlap per URL
+# and concurrent requests do not spin up threads of their own
+_IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='feat')
+IO_TIMEOUT = 10  # seconds to wait for any single lookup
+BATCH_CONCURRENCY = 8  # urls extracted at once by extract_features_batch
+MAX_HTML_BYTES = 512 * 1024  # enough for <head>, forms and scripts of a normal page
+HTML_CHUNK_SIZE = 16 * 1024
+HTML_READ_DEADLINE = 5  # seconds for the whole body, on top of the connect/HEAD checks
+
+# one pooled session for page fetches so repeat hosts reuse their TCP/TLS connection
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.max_redirects = 2  # limit redirects
+_HTTP_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+})
+_HTTP_ADAPTER = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=0)
+_HTTP_SESSION.mount('http://', _HTTP_ADAPTER)
+_HTTP_SESSION.mount('https://', _HTTP_ADAPTER)
+
+# url patterns, compiled once instead of per call
+_IP_RE = re.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')
+# characters counted for special_char_density. they are all ascii and never part
+# of a multi-byte utf-8 sequence, so deleting them from the encoded url in one C
+# call and comparing lengths counts them exactly, without building a match list
+_SPECIAL_CHAR_BYTES = b'%-_=&?'
+# popup scripts in fetched pages, one case-insensitive pass over the body
+_POPUP_RE = re.compile(r'window\.open|popup', re.IGNORECASE)
+
+# suspicious top-level domains
+ULTRA_SUSPICIOUS_TLDS = frozenset((
+    'tk', 'ml', 'ga', 'cf', 'gq', 'top', 'click', 'download',
+    'link', 'info', 'biz', 'xyz', 'club', 'online', 'site',
+    'website', 'space', 'tech', 'store', 'shop', 'win', 'vip',
+    'icu', 'rest', 'cc', 'sbs', 'world', 'support'
+))
+
+# phishing keywords 
+ULTRA_PHISHING_KEYWORDS = (
+    'verify', 'secure', 'login', 'signin', 'account', 'update', 'confirm',
+    'suspended', 'locked', 'expired', 'urgent', 'immediate', 'security',
+    'alert', 'warning', 'action', 'required', 'validation', 'authenticate',
+    'verification', 'restore', 'unlock', 'resolve', 'customer',
+    'banking', 'payment', 'billing', 'invoice', 'transaction', 'refund',
+    'card', 'credit', 'debit', 'wallet', 'paypal', 'stripe',
+    'support', 'service', 'center', 'portal', 'help', 'notification'
+)
+# zero-width lookahead so overlapping keywords are all reported in one pass
+# (no keyword is a prefix of another, so each start position yields at most one)
+_PHISHING_KEYWORD_RE = re.compile('(?=(' + '|'.join(map(re.escape, ULTRA_PHISHING_KEYWORDS)) + '))')
+
+# brand impersonation 
+MAJOR_BRANDS = (
+    'google', 'microsoft', 'apple', 'amazon', 'facebook', 'meta',
+    'instagram', 'twitter', 'linkedin', 'youtube', 'netflix', 'spotify',
+    'adobe', 'zoom', 'dropbox', 'gmail', 'outlook', 'icloud',
+    'paypal', 'stripe', 'visa', 'mastercard', 'amex', 'discover',
+    'chase', 'wells', 'bofa', 'citi', 'usbank', 'hsbc', 'td',
+    'bankofamerica', 'wellsfargo', 'citibank', 'pnc', 'capitalone',
+    'bank', 'credit', 'union', 'financial', 'banking'
+)
+
+# suspicious domain patterns
+SUSPICIOUS_DOMAIN_PATTERNS = (
+    'verification', 'security', 'account', 'update', 'confirm',
+    'locked', 'suspended', 'expired', 'urgent', 'immediate',
+    'customer', 'support', 'service', 'center', 'portal'
+)
+
+# url shotner detection
+URL_SHORTENERS = (
+    'bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'is.gd',
+    'buff.ly', 'adf.ly', 'short.link', 'tiny.cc', 'rb.gy',
+    'cutt.ly', 'bitly.com', 'short.io', 'rebrand.ly'
+)
+
+# each list only answers "does any entry occur", so one alternation per list
+# scans the string once instead of running a substring test per entry
+_BRAND_RE = re.compile('|'.join(map(re.escape, MAJOR_BRANDS)))
+_SUSPICIOUS_PATTERN_RE = re.compile('|'.join(map(re.escape, SUSPICIOUS_DOMAIN_PATTERNS)))
+_SHORTENER_RE = re.compile('|'.join(map(re.escape, URL_SHORTENERS)))
+
+# advanced character substitution patterns for typosquatting, (from, to options)
+ADVANCED_SUBSTITUTIONS = (
+    ('0', ('o', 'O')),
+    ('o', ('0',)),
+    ('1', ('l', 'I', 'i')),
+    ('l', ('1', 'I', 'i')),
+    ('i', ('1', 'l')),
+    ('I', ('1', 'l', 'i')),
+    ('5', ('s', 'S')),
+    ('s', ('5', '$')),
+    ('e', ('3',)),
+    ('a', ('@',)),
+    ('g', ('q',)),
+    ('n', ('m',)),
+    ('rn', ('m',)),
+    ('cl', ('d',)),
+    ('vv', ('w',)),
+)
+
+# brand domains bucketed by base length, built on first typosquatting check
+_BRANDS_BY_LEN: Optional[Dict[int, List[Tuple[int, str, str]]]] = None
+
+# registration data over RDAP - rdap.org redirects to the registry's own server
+RDAP_URL = "https://rdap.org/domain/{}"
+RDAP_TIMEOUT = 3
+
+WHOIS_CACHE_TTL = 60 * 60 * 24  # registration data rarely changes within a day
+DNS_CACHE_TTL = 60 * 60  # 1 hour
+ADDR_CACHE_TTL = 60 * 5  # short, so the check stays close to what the fetch connects to
+FEATURES_CACHE_TTL = 60 * 60  # 1 hour, matches the dns data the features depend on
+
+class TTLCache:
+    """small thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+# lookups keyed by registrable domain, shared by every request in the process
+_WHOIS_CACHE = TTLCache(maxsize=4096, ttl=WHOIS_CACHE_TTL)
+_DNS_CACHE = TTLCache(maxsize=4096, ttl=DNS_CACHE_TTL)
+# host -> resolved addresses for the html fetch safety check
+_ADDR_CACHE = TTLCache(maxsize=4096, ttl=ADDR_CACHE_TTL)
+# one lock per domain with a whois query in flight, so concurrent requests for
+# urls on the same site wait for a single lookup instead of each sending one
+_WHOIS_INFLIGHT: Dict[str, threading.Lock] = {}
+_WHOIS_INFLIGHT_LOCK = threading.Lock()
+# full feature dicts keyed by url
+_FEATURES_CACHE = TTLCache(maxsize=2048, ttl=FEATURES_CACHE_TTL)
+
+# record types queried per domain, resolved concurrently on their own pool so
+# they never wait behind the feature lookups that call get_dns_records
+DNS_RECORD_TYPES = ('A', 'MX', 'NS', 'TXT', 'CNAME')
+_DNS_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dns')
+_resolver: Optional[dns.resolver.Resolver] = None
+
+def _get_resolver() -> dns.resolver.Resolver:
+    """shared resolver with dnspython's answer cache, created on first use"""
+    global _resolver
+    if _resolver is None:
+        resolver = dns.resolver.Resolver()
+        resolver.cache = dns.resolver.LRUCache(max_size=10000)
+        resolver.lifetime = 3.0
+        _resolver = resolver
+    return _resolver
+
+def parse_rdap_date(value: Optional[str]) -> Optional[datetime]:
+    """RDAP event timestamp as a naive utc datetime, comparable with datetime.now() like whois dates"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
 def is_domain_whitelisted(domain: str) -> bool:
-    """Check if the domain is in the whitelist."""
-    return any(domain.endswith(allowed) for allowed in HTTP_WHITELIST)
+    """Check if the domain, or a parent domain of it, is in the whitelist."""
+    # walk the label suffixes (a.b.example.com -> b.example.com -> example.com)
+    # so the cost is one set lookup per label, and 'badexample.com' no longer
+    # passes as 'example.com' the way a raw endswith did
+    while True:
+        if domain in _HTTP_WHITELIST_SET:
+            return True
+        dot = domain.find('.')
+        if dot < 0:
+            return False
+        domain = domain[dot + 1:]
+
+# bundled public suffix snapshot - the default extractor fetches the live list
+# over the network on first use, which stalls (or fails) the first request
+# (a native splitter would save ~3us per url, but subdomain/domain/suffix feed
+# trained features, so the split has to stay exactly what the models were fit on).
+# no disk cache either, the parsed snapshot only lives in memory. the snapshot is the
+# one shipped inside the installed tldextract, so refreshing it means bumping
+# tldextract in requirements.txt (check the split of known urls doesn't change)
+_TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+def is_ipv4_literal(host: str) -> bool:
+    """cheap check for dotted-digit hosts, no exception raised for ordinary names"""
+    return host.replace('.', '').isdigit()
+
+@lru_cache(maxsize=4096)
+def extract_domain_parts(url: str):
+    """tldextract result for a url, memoized since one analysis splits the same url several times"""
+    return _TLD_EXTRACT(url)
+
+# c * log2(c) for the character counts seen in domain labels (at most 63 chars)
+_C_LOG2_C = tuple(c * math.log2(c) if c else 0.0 for c in range(256))
+
+def char_stats(text: str) -> Tuple[float, int]:
+    """shannon entropy (case-insensitive) and digit count from one character histogram"""
+    if not text:
+        return 0, 0
+    lowered = text.lower()
+    counts = Counter(lowered)
+    # entropy = log2(n) - sum(c * log2(c)) / n, with c * log2(c) read from a table
+    c_log_c = 0.0
+    for count in counts.values():
+        c_log_c += _C_LOG2_C[count] if count < len(_C_LOG2_C) else count * math.log2(count)
+    n = len(text)
+    entropy = (math.log2(n) * len(lowered) - c_log_c) / n
+    digit_count = sum(count for char, count in counts.items() if char.isdigit())
+    return entropy, digit_count
+
+class _StartTagCollector:
+    """lxml parser target that keeps (tag, attributes) for every start tag"""
+
+    def __init__(self):
+        self.tags: List[Tuple[str, Mapping[str, str]]] = []
+
+    def start(self, tag, attrib):
+        self.tags.append((tag, attrib))
+
+    def close(self):
+        return self.tags
 
 class FeatureExtractor:
     """service for extracting comprehensive features for deep URL analysis"""
@@ -51,7 +303,7 @@ class FeatureExtractor:
                 return False
                 
             # check domain against whitelist (if exact match allowed)
-            if domain in HTTP_WHITELIST:
+            if domain in _HTTP_WHITELIST_SET:
                 return True
             
             # check for dangerous internal hostnames
@@ -61,44 +313,16 @@ class FeatureExtractor:
                 logger.warning(f"Rejected URL with dangerous hostname: {url}")
                 return False
                 
-            # resolve domain to IP
-            try:
-                ip_addresses = socket.getaddrinfo(domain, None)
-            except socket.gaierror:
-                logger.warning(f"Could not resolve domain: {domain}")
+            # hostnames are resolved once later by resolve_url_to_ips and checked with
+            # is_ip_safe, so only ip literals need checking here (ipv6 hosts were
+            # already cut at the port split, so digits and dots is the whole test)
+            if not is_ipv4_literal(domain):
+                return True
+
+            if not FeatureExtractor.is_ip_safe(domain):
+                logger.warning(f"Rejected URL with private/internal IP: {url}")
                 return False
-                
-            # check if any resolved IP is private/internal
-            for addr_info in ip_addresses:
-                ip_str = addr_info[4][0]
-                try:
-                    ip = ipaddress.ip_address(ip_str)
-                    if ip.is_private or ip.is_loopback or ip.is_reserved or ip.is_link_local or ip.is_multicast:
-                        logger.warning(f"Rejected URL resolving to private/internal IP: {url} -> {ip_str}")
-                        return False
-                    
-                    # check for specific CIDR blocks explicitly
-                    forbidden_cidrs = [
-                        '10.0.0.0/8',      # private network
-                        '172.16.0.0/12',   # private network
-                        '192.168.0.0/16',  # private network
-                        '127.0.0.0/8',     # localhost
-                        '169.254.0.0/16',  # link-local
-                        '192.0.2.0/24',    # test-net
-                        '224.0.0.0/4',     # multicast
-                        '240.0.0.0/4'      # reserved
-                    ]
-                    
-                    for cidr in forbidden_cidrs:
-                        network = ipaddress.ip_network(cidr)
-                        if ip in network:
-                            logger.warning(f"Rejected URL with IP in forbidden CIDR: {url} -> {ip_str} in {cidr}")
-                            return False
-                        
-                except ValueError:
-                    logger.warning(f"Invalid IP address: {ip_str}")
-                    return False
-                    
+
             return True
         except Exception as e:
             logger.error(f"Error checking URL safety: {str(e)}")
@@ -110,25 +334,63 @@ class FeatureExtractor:
         extract all features needed for deep URL analysis for the chatbot model
         """
         try:
+            # repeat analyses of the same url skip the whois/dns/html round trips
+            cached = _FEATURES_CACHE.get(url)
+            if cached is not None:
+                return dict(cached)
+
             start_time = time.time()
             
-            features = FeatureExtractor.extract_url_features(url)
+            features, complete = FeatureExtractor._extract_url_features(url)
+            # results that fell back to defaults after a failed or timed out lookup
+            # are not cached, so the next request retries the lookups
+            if complete:
+                _FEATURES_CACHE.set(url, features)
             
             # log timing for monitoring
             elapsed = time.time() - start_time
             logger.info(f"Feature extraction completed in {elapsed:.2f}s for {url[:30]}")
             
-            return features
+            return dict(features)
             
         except Exception as e:
             logger.error(f"Error extracting features for URL {url}: {str(e)}", exc_info=True)
             # return default features in case of error
             return FeatureExtractor.get_default_features()
     
+    @staticmethod
+    async def extract_features_async(url: str) -> Dict[str, Any]:
+        """
+        extract features without blocking the event loop, for use from async endpoints
+        """
+        # the whois/dns/html lookups already overlap on the shared pool, so the
+        # blocking extraction just moves onto a worker thread
+        return await asyncio.to_thread(FeatureExtractor.extract_features, url)
+
+    @staticmethod
+    async def extract_features_batch(urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        extract features for several URLs concurrently, results keep the input order
+        """
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def _extract_one(url: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await FeatureExtractor.extract_features_async(url)
+
+        return list(await asyncio.gather(*(_extract_one(url) for url in urls)))
+
     @staticmethod
     def get_domain(url):
         try:
-            extracted = tldextract.extract(url)
+            return FeatureExtractor.get_domain_from_parts(extract_domain_parts(url))
+        except:
+            return None, None
+
+    @staticmethod
+    def get_domain_from_parts(extracted):
+        """registrable and full domain from an already extracted url"""
+        try:
             domain = f"{extracted.domain}.{extracted.suffix}"
             if extracted.subdomain:
                 full_domain = f"{extracted.subdomain}.{domain}"
@@ -141,18 +403,49 @@ class FeatureExtractor:
     @staticmethod
     def get_domain_info(domain):
         """domain registration info using WHOIS"""
+        domain = domain.lower().rstrip('.')
+        cached = _WHOIS_CACHE.get(domain)
+        if cached is not None:
+            return dict(cached)
+
+        with _WHOIS_INFLIGHT_LOCK:
+            lock = _WHOIS_INFLIGHT.setdefault(domain, threading.Lock())
         try:
-            w = whois.whois(domain)
+            with lock:
+                # another thread may have finished the lookup while we waited
+                cached = _WHOIS_CACHE.get(domain)
+                if cached is not None:
+                    return dict(cached)
+                return FeatureExtractor._lookup_domain_info(domain)
+        finally:
+            with _WHOIS_INFLIGHT_LOCK:
+                if _WHOIS_INFLIGHT.get(domain) is lock and not lock.locked():
+                    del _WHOIS_INFLIGHT[domain]
+
+    @staticmethod
+    def _lookup_domain_info(domain):
+        """uncached registration lookup (RDAP, then WHOIS), stores successful results in the whois cache"""
+        try:
+            # structured json over the pooled https session; falls back to a raw
+            # whois query for tlds without rdap or when it has no creation date
+            registration = FeatureExtractor._lookup_rdap(domain)
+            if registration is not None:
+                creation_date, expiration_date, registrar, name_servers = registration
+            else:
+                w = whois.whois(domain)
 
-            # get creation date
-            creation_date = w.creation_date
-            if isinstance(creation_date, list):
-                creation_date = creation_date[0]
+                # get creation date
+                creation_date = w.creation_date
+                if isinstance(creation_date, list):
+                    creation_date = creation_date[0]
 
-            # get expiration date
-            expiration_date = w.expiration_date
-            if isinstance(expiration_date, list):
-                expiration_date = expiration_date[0]
+                # get expiration date
+                expiration_date = w.expiration_date
+                if isinstance(expiration_date, list):
+                    expiration_date = expiration_date[0]
+
+                registrar = getattr(w, 'registrar', None)
+                name_servers = getattr(w, 'name_servers', [])
 
             # calculate age in days
             if creation_date:
@@ -166,29 +459,67 @@ class FeatureExtractor:
             else:
                 reg_len = -1
 
-            return {
+            info = {
                 'domain_age': domain_age,
                 'registration_length': reg_len,
                 'creation_date': creation_date,
                 'expiration_date': expiration_date,
-                'registrar': getattr(w, 'registrar', None),
-                'name_servers': getattr(w, 'name_servers', [])
+                'registrar': registrar,
+                'name_servers': name_servers
             }
+            # only successful lookups are cached so transient failures are retried
+            _WHOIS_CACHE.set(domain, info)
+            return dict(info)
         except Exception as e:
             logger.debug(f"WHOIS lookup failed for {domain}: {str(e)}")
-            return {
-                'domain_age': -1,
-                'registration_length': -1,
-                'creation_date': None,
-                'expiration_date': None,
-                'registrar': None,
-                'name_servers': []
-            }
+            return FeatureExtractor.get_default_domain_info()
+
+    @staticmethod
+    def _lookup_rdap(domain):
+        """(creation, expiration, registrar, name servers) from RDAP, None if unavailable"""
+        try:
+            response = _HTTP_SESSION.get(
+                RDAP_URL.format(quote(domain)), timeout=RDAP_TIMEOUT,
+                headers={'Accept': 'application/rdap+json'}
+            )
+            if response.status_code != 200:
+                return None
+            data = response.json()
+
+            events = {event.get('eventAction'): event.get('eventDate') for event in data.get('events', [])}
+            creation_date = parse_rdap_date(events.get('registration'))
+            if creation_date is None:
+                return None
+            expiration_date = parse_rdap_date(events.get('expiration'))
+
+            # registrar name is the "fn" entry of the registrar entity's vcard
+            registrar = None
+            for entity in data.get('entities', []):
+                if 'registrar' in entity.get('roles', []):
+                    vcard = entity.get('vcardArray', [None, []])[1]
+                    registrar = next((field[3] for field in vcard if field[0] == 'fn'), None)
+                    break
+
+            name_servers = [ns['ldhName'] for ns in data.get('nameservers', []) if ns.get('ldhName')]
+            return creation_date, expiration_date, registrar, name_servers
+        except Exception as e:
+            logger.debug(f"RDAP lookup failed for {domain}: {str(e)}")
+            return None
+
+    @staticmethod
+    def get_default_domain_info():
+        return {
+            'domain_age': -1,
+            'registration_length': -1,
+            'creation_date': None,
+            'expiration_date': None,
+            'registrar': None,
+            'name_servers': []
+        }
     
     @staticmethod
-    def get_dns_records(domain):
-        """checking if domain has proper DNS records"""
-        records = {
+    def get_default_dns_records():
+        return {
             'has_a': False,
             'has_mx': False,
             'has_ns': False,
@@ -200,55 +531,60 @@ class FeatureExtractor:
             'a_count': 0
         }
 
+    @staticmethod
+    def get_dns_records(domain):
+        """checking if domain has proper DNS records"""
+        return FeatureExtractor._get_dns_records(domain)[0]
+
+    @staticmethod
+    def _get_dns_records(domain):
+        """(records, complete) - complete is False when a query failed transiently"""
+        cached = _DNS_CACHE.get(domain)
+        if cached is not None:
+            return dict(cached), True
+
+        records = FeatureExtractor.get_default_dns_records()
+
         try:
-            # a record
-            try:
-                answers = dns.resolver.resolve(domain, 'A')
-                records['has_a'] = len(answers) > 0
-                records['a_count'] = len(answers)
-                records['total_records'] += len(answers)
-            except:
-                pass
-
-            # mx record
-            try:
-                answers = dns.resolver.resolve(domain, 'MX')
-                records['has_mx'] = len(answers) > 0
-                records['mx_count'] = len(answers)
-                records['total_records'] += len(answers)
-            except:
-                pass
-
-            # ns record
-            try:
-                answers = dns.resolver.resolve(domain, 'NS')
-                records['has_ns'] = len(answers) > 0
-                records['ns_count'] = len(answers)
-                records['total_records'] += len(answers)
-            except:
-                pass
-
-            # txt record
-            try:
-                answers = dns.resolver.resolve(domain, 'TXT')
-                records['has_txt'] = len(answers) > 0
-                records['total_records'] += len(answers)
-            except:
-                pass
+            # the record types are independent queries, so overlap their round trips
+            resolver = _get_resolver()
+            futures = {rtype: _DNS_POOL.submit(resolver.resolve, domain, rtype) for rtype in DNS_RECORD_TYPES}
+            complete = True
+            for rtype, future in futures.items():
+                try:
+                    count = len(future.result())
+                except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                    # definitive answer, the domain has no records of this type
+                    continue
+                except Exception as e:
+                    # timeouts and unreachable nameservers say nothing about the domain
+                    logger.debug(f"DNS {rtype} lookup failed for {domain}: {str(e)}")
+                    complete = False
+                    continue
 
-            # cname record
-            try:
-                answers = dns.resolver.resolve(domain, 'CNAME')
-                records['has_cname'] = len(answers) > 0
-                records['total_records'] += len(answers)
-            except:
-                pass
+                records[f'has_{rtype.lower()}'] = count > 0
+                if rtype in ('A', 'MX', 'NS'):
+                    records[f'{rtype.lower()}_count'] = count
+                records['total_records'] += count
 
-            return records
+            # only cache when every query was answered, so transient failures are retried
+            if complete:
+                _DNS_CACHE.set(domain, records)
+            return dict(records), complete
         except Exception as e:
             logger.debug(f"DNS lookup failed for {domain}: {str(e)}")
-            return records
+            return records, False
     
+    @staticmethod
+    def _await_lookup(future, lookup, domain):
+        """wait for a pooled lookup, None if it timed out"""
+        try:
+            return future.result(timeout=IO_TIMEOUT)
+        except FutureTimeoutError:
+            logger.debug(f"{lookup.__name__} timed out for {domain}")
+            future.cancel()
+            return None
+
     @staticmethod
     def get_default_html_features():
         return {
@@ -271,111 +607,152 @@ class FeatureExtractor:
     @staticmethod
     def analyze_html_content(url):
         try:
+            # Ensure the domain is whitelisted - a plain string check, so it runs
+            # before the safety checks that resolve the host
+            parsed_url = urlparse(url)
+            domain = parsed_url.netloc
+            if not is_domain_whitelisted(domain):
+                logger.warning(f"Skipping URL with non-whitelisted domain: {domain}")
+                return FeatureExtractor.get_default_html_features()
+
             # validate the URL first
             if not FeatureExtractor.is_url_safe(url):
                 logger.warning(f"Skipping unsafe URL: {url}")
                 return FeatureExtractor.get_default_html_features()
 
             # resolve the URL to ensure it does not point to private/internal IPs
-            resolved_ip = FeatureExtractor.resolve_url_to_ip(url)
-            if not FeatureExtractor.is_ip_safe(resolved_ip):
-                logger.warning(f"Skipping URL with unsafe IP: {url} (resolved to {resolved_ip})")
+            # every address is checked (not just the first A record), since the
+            # http client may connect to any of them
+            resolved_ips = FeatureExtractor.resolve_url_to_ips(url)
+            if not resolved_ips or not all(FeatureExtractor.is_ip_safe(ip) for ip in resolved_ips):
+                logger.warning(f"Skipping URL with unsafe IP: {url} (resolved to {resolved_ips})")
                 return FeatureExtractor.get_default_html_features()
-            
-            # ensures no redirection to internal resources
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc
-            
-            # create a session with restrictive settings
-            session = requests.Session()
-            session.max_redirects = 2  # limit redirects
-                
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
 
-            # Ensure the domain is whitelisted
-            if not is_domain_whitelisted(domain):
-                logger.warning(f"Skipping URL with non-whitelisted domain: {domain}")
+            # only fetch the body when the server says it is an HTML page. the short
+            # connect timeout fails fast on dead hosts, and the connection it opens
+            # goes back to the session pool for the GET (no separate tcp probe)
+            try:
+                head = _HTTP_SESSION.head(url, timeout=(0.8, 1), allow_redirects=False, verify=True)
+            except requests.exceptions.ConnectionError:
+                logger.debug(f"Host not reachable, skipping HTML analysis: {url}")
                 return FeatureExtractor.get_default_html_features()
+            if head.status_code not in (405, 501):  # HEAD not supported, fall through to GET
+                content_type = head.headers.get('Content-Type', '')
+                if head.status_code != 200 or 'text/html' not in content_type.lower():
+                    return FeatureExtractor.get_default_html_features()
             
-            # Perform the HTTP request with SSL verification enabled
-            response = session.get(url, headers=headers, timeout=3, allow_redirects=False, verify=True)
-
-            if response.status_code != 200:
-                return FeatureExtractor.get_default_html_features()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Perform the HTTP request with SSL verification enabled, streaming so
+            # that at most MAX_HTML_BYTES of the body is downloaded and parsed
+            with _HTTP_SESSION.get(url, timeout=3, allow_redirects=False, verify=True, stream=True) as response:
+                if response.status_code != 200:
+                    return FeatureExtractor.get_default_html_features()
+                # servers that refuse HEAD skipped the content type check above;
+                # don't download or run the parser over non-html bodies
+                if 'text/html' not in response.headers.get('Content-Type', '').lower():
+                    return FeatureExtractor.get_default_html_features()
+                # read decoded chunks up to the cap and an overall deadline - the
+                # request timeout is per read, so a server dripping bytes could
+                # otherwise hold this thread for minutes
+                chunks = []
+                size = 0
+                deadline = time.monotonic() + HTML_READ_DEADLINE
+                for chunk in response.iter_content(HTML_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= MAX_HTML_BYTES or time.monotonic() > deadline:
+                        break
+                body = b''.join(chunks)[:MAX_HTML_BYTES]
+                encoding = response.encoding or 'utf-8'
+
+            # decode once for both the DOM parse and the script scan
+            html = body.decode(encoding, errors='replace')
+            # lxml's html parser streams start tags straight to a collector, no
+            # tree is built; feed() also accepts text with an xml encoding declaration
+            parser = etree.HTMLParser(target=_StartTagCollector())
+            parser.feed(html)
+            tags = parser.close()
             domain, full_domain = FeatureExtractor.get_domain(url)
 
             features = FeatureExtractor.get_default_html_features()
 
-            # favicon analysis
-            favicon = soup.find('link', rel=lambda r: r and 'icon' in r.lower())
-            if favicon and favicon.get('href'):
+            # single sweep over the start tags, dispatching on tag name instead of one
+            # find_all traversal per element type
+            favicon = None
+            for name, attrs in tags:
+                # javascript event analysis
+                if 'onload' in attrs:
+                    features['onload_events'] += 1
+
+                if name == 'a':
+                    # link analysis
+                    href = attrs.get('href')
+                    if href is None:
+                        continue
+                    href = href.lower()
+                    if href.startswith('http'):
+                        link_domain = FeatureExtractor.get_domain(href)[0]
+                        if link_domain != domain:
+                            features['external_links'] += 1
+                        else:
+                            features['internal_links'] += 1
+                    else:
+                        features['internal_links'] += 1
+
+                elif name == 'link':
+                    rel = attrs.get('rel', '').split()
+
+                    # favicon analysis (first icon link only)
+                    if favicon is None and any('icon' in r.lower() for r in rel):
+                        favicon = attrs
+
+                    # css analysis
+                    if 'stylesheet' in rel:
+                        href = attrs.get('href', '')
+                        if href.startswith('http'):
+                            css_domain = FeatureExtractor.get_domain(href)[0]
+                            if css_domain != domain:
+                                features['external_css'] += 1
+
+                elif name == 'script':
+                    # script analysis
+                    src = attrs.get('src')
+                    if src is not None and src.startswith('http'):
+                        script_domain = FeatureExtractor.get_domain(src)[0]
+                        if script_domain != domain:
+                            features['external_scripts'] += 1
+
+                elif name == 'input':
+                    # input analysis
+                    features['input_count'] += 1
+                    if attrs.get('type') == 'hidden':
+                        features['hidden_inputs'] += 1
+
+                elif name == 'form':
+                    # forms analysis
+                    features['form_count'] += 1
+                    action = attrs.get('action', '')
+                    if action and action.startswith('http'):
+                        action_domain = FeatureExtractor.get_domain(action)[0]
+                        if action_domain != domain:
+                            features['form_action_external'] = True
+                            features['suspicious_forms'] += 1
+
+                elif name == 'iframe':
+                    # iframe analysis
+                    features['iframe_count'] += 1
+
+                elif name == 'meta':
+                    # meta refresh detection
+                    if attrs.get('http-equiv') == 'refresh':
+                        features['meta_refresh'] = True
+
+            if favicon is not None and favicon.get('href'):
                 favicon_url = favicon['href']
                 if favicon_url.startswith('http'):
                     favicon_domain = FeatureExtractor.get_domain(favicon_url)[0]
                     features['external_favicon'] = favicon_domain != domain
 
-            # forms analysis
-            forms = soup.find_all('form')
-            features['form_count'] = len(forms)
-
-            for form in forms:
-                action = form.get('action', '')
-                if action and action.startswith('http'):
-                    action_domain = FeatureExtractor.get_domain(action)[0]
-                    if action_domain != domain:
-                        features['form_action_external'] = True
-                        features['suspicious_forms'] += 1
-
-            # input analysis
-            inputs = soup.find_all('input')
-            features['input_count'] = len(inputs)
-            features['hidden_inputs'] = len([inp for inp in inputs if inp.get('type') == 'hidden'])
-
-            # script analysis
-            scripts = soup.find_all('script', src=True)
-            for script in scripts:
-                if script['src'].startswith('http'):
-                    script_domain = FeatureExtractor.get_domain(script['src'])[0]
-                    if script_domain != domain:
-                        features['external_scripts'] += 1
-
-            # css analysis
-            css_links = soup.find_all('link', rel='stylesheet')
-            for css in css_links:
-                href = css.get('href', '')
-                if href.startswith('http'):
-                    css_domain = FeatureExtractor.get_domain(href)[0]
-                    if css_domain != domain:
-                        features['external_css'] += 1
-
-            # link analysis
-            links = soup.find_all('a', href=True)
-            for link in links:
-                href = link['href'].lower()
-                if href.startswith('http'):
-                    link_domain = FeatureExtractor.get_domain(href)[0]
-                    if link_domain != domain:
-                        features['external_links'] += 1
-                    else:
-                        features['internal_links'] += 1
-                else:
-                    features['internal_links'] += 1
-
-            # iframe analysis
-            iframes = soup.find_all('iframe')
-            features['iframe_count'] = len(iframes)
-
-            # meta refresh detection
-            meta_refresh = soup.find('meta', attrs={'http-equiv': 'refresh'})
-            features['meta_refresh'] = bool(meta_refresh)
-
-            # javascript event analysis
-            features['onload_events'] = len(soup.find_all(attrs={'onload': True}))
-            features['popup_windows'] = len(re.findall(r'window\.open|popup', response.text, re.IGNORECASE))
+            features['popup_windows'] = len(_POPUP_RE.findall(html))
 
             return features
 
@@ -384,20 +761,34 @@ class FeatureExtractor:
             return FeatureExtractor.get_default_html_features()
     
     @staticmethod
-    def resolve_url_to_ip(url: str) -> str:
+    def resolve_url_to_ips(url: str) -> List[str]:
+        """every ipv4/ipv6 address the url's host resolves to, cached briefly"""
         try:
-            parsed_url = urlparse(url)
-            hostname = parsed_url.hostname
-            return socket.gethostbyname(hostname)
+            hostname = urlparse(url).hostname
+            cached = _ADDR_CACHE.get(hostname)
+            if cached is not None:
+                return cached
+            infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+            ips = list(dict.fromkeys(info[4][0] for info in infos))
+            _ADDR_CACHE.set(hostname, ips)
+            return ips
         except Exception as e:
             logger.error(f"Failed to resolve URL to IP: {url}, error: {str(e)}")
-            return ""
+            return []
 
     @staticmethod
     def is_ip_safe(ip: str) -> bool:
         try:
             ip_obj = ipaddress.ip_address(ip)
-            return not (ip_obj.is_private or ip_obj.is_reserved or ip_obj.is_loopback)
+            if ip_obj.is_private or ip_obj.is_reserved or ip_obj.is_loopback or ip_obj.is_link_local or ip_obj.is_multicast:
+                return False
+
+            # check for specific CIDR blocks explicitly
+            for network in _FORBIDDEN_NETS:
+                if ip_obj in network:
+                    logger.warning(f"Rejected IP in forbidden CIDR: {ip} in {network}")
+                    return False
+            return True
         except ValueError:
             logger.error(f"Invalid IP address: {ip}")
             return False
@@ -449,14 +840,32 @@ class FeatureExtractor:
             'usps': ['usps.com', 'usps.gov']
         }
     
+    @staticmethod
+    def get_brand_candidates(length: int, max_diff: int = 4) -> List[Tuple[str, str]]:
+        """brand (base, domain) pairs whose base length is within max_diff of length"""
+        global _BRANDS_BY_LEN
+        if _BRANDS_BY_LEN is None:
+            # bucket once by base length, keeping the database order inside each bucket
+            buckets: Dict[int, List[Tuple[int, str, str]]] = {}
+            order = 0
+            for domains in FeatureExtractor.get_comprehensive_brand_domains().values():
+                for brand_domain in domains:
+                    brand_base = brand_domain.split('.')[0]
+                    buckets.setdefault(len(brand_base), []).append((order, brand_base, brand_domain))
+                    order += 1
+            _BRANDS_BY_LEN = buckets
+
+        candidates = []
+        for size in range(length - max_diff, length + max_diff + 1):
+            candidates.extend(_BRANDS_BY_LEN.get(size, ()))
+        # first match wins in the typosquatting checks, so restore the database order
+        candidates.sort()
+        return [(brand_base, brand_domain) for _, brand_base, brand_domain in candidates]
+
     @staticmethod
     def detect_advanced_typosquatting(domain):
         """advanced typosquatting detection with multiple techniques"""
         try:
-            brand_domains = []
-            for domains in FeatureExtractor.get_comprehensive_brand_domains().values():
-                brand_domains.extend(domains)
-
             result = {
                 'is_typosquatting': False,
                 'impersonated_domain': None,
@@ -471,32 +880,18 @@ class FeatureExtractor:
             domain = domain.lower()
             domain_base = domain.split('.')[0]
 
-            # advanced character substitution patterns
-            advanced_substitutions = {
-                '0': ['o', 'O'],
-                'o': ['0'],
-                '1': ['l', 'I', 'i'],
-                'l': ['1', 'I', 'i'],
-                'i': ['1', 'l'],
-                'I': ['1', 'l', 'i'],
-                '5': ['s', 'S'],
-                's': ['5', '$'],
-                'e': ['3'],
-                'a': ['@'],
-                'g': ['q'],
-                'n': ['m'],
-                'rn': ['m'],
-                'cl': ['d'],
-                'vv': ['w']
+            # every substitution and single-character deletion of the input, built
+            # once here instead of again for each candidate brand
+            substituted = {
+                domain_base.replace(sub_from, sub_to)
+                for sub_from, sub_to_list in ADVANCED_SUBSTITUTIONS
+                if sub_from in domain_base
+                for sub_to in sub_to_list
             }
+            deleted = {domain_base[:i] + domain_base[i+1:] for i in range(len(domain_base))}
 
-            for brand_domain in brand_domains:
-                brand_base = brand_domain.split('.')[0]
-
-                # skip if length difference is too large
-                if abs(len(domain_base) - len(brand_base)) > 4:
-                    continue
-
+            # only brands whose base is within 4 characters of the input length
+            for brand_base, brand_domain in FeatureExtractor.get_brand_candidates(len(domain_base)):
                 # 1. levenshtein distance check
                 try:
                     distance = Levenshtein.distance(domain_base, brand_base)
@@ -517,32 +912,26 @@ class FeatureExtractor:
                     pass
 
                 # 2. advanced substitution check
-                for sub_from, sub_to_list in advanced_substitutions.items():
-                    for sub_to in sub_to_list:
-                        if sub_from in domain_base:
-                            test_domain = domain_base.replace(sub_from, sub_to)
-                            if test_domain == brand_base:
-                                result.update({
-                                    'is_typosquatting': True,
-                                    'impersonated_domain': brand_domain,
-                                    'attack_type': 'character_substitution',
-                                    'confidence': 0.9
-                                })
-                                return result
+                if brand_base in substituted:
+                    result.update({
+                        'is_typosquatting': True,
+                        'impersonated_domain': brand_domain,
+                        'attack_type': 'character_substitution',
+                        'confidence': 0.9
+                    })
+                    return result
 
                 # 3. insertion/deletion attack
                 if len(domain_base) == len(brand_base) + 1:
                     # check character insertion
-                    for i in range(len(domain_base)):
-                        test_domain = domain_base[:i] + domain_base[i+1:]
-                        if test_domain == brand_base:
-                            result.update({
-                                'is_typosquatting': True,
-                                'impersonated_domain': brand_domain,
-                                'attack_type': 'character_insertion',
-                                'confidence': 0.85
-                            })
-                            return result
+                    if brand_base in deleted:
+                        result.update({
+                            'is_typosquatting': True,
+                            'impersonated_domain': brand_domain,
+                            'attack_type': 'character_insertion',
+                            'confidence': 0.85
+                        })
+                        return result
 
             return result
 
@@ -551,10 +940,11 @@ class FeatureExtractor:
             return {'is_typosquatting': False, 'impersonated_domain': None, 'edit_distance': None, 'attack_type': None, 'confidence': 0.0}
     
     @staticmethod
-    def detect_brand_in_subdomain(url):
+    def detect_brand_in_subdomain(url, extracted=None):
         """detect brand names in subdomains with advanced pattern matching"""
         try:
-            extracted = tldextract.extract(url)
+            if extracted is None:
+                extracted = extract_domain_parts(url)
             if not extracted.subdomain:
                 return {'has_brand_in_subdomain': False, 'impersonated_brand': None}
 
@@ -646,22 +1036,35 @@ class FeatureExtractor:
     @staticmethod
     def extract_url_features(url):
         """extract comprehensive features for chatbot deep analysis (50+ features)"""
+        return FeatureExtractor._extract_url_features(url)[0]
+
+    @staticmethod
+    def _extract_url_features(url):
+        """(features, complete) - complete is False when any part fell back to defaults"""
         try:
             features = FeatureExtractor.get_default_features()
 
+            # parse once, every structural feature below reads from these
+            parsed_url = urlparse(url)
+            url_lower = url.lower()
+
             # basic url structure
-            features['UsingIP'] = 1 if bool(re.search(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b', url)) else 0
+            features['UsingIP'] = 1 if _IP_RE.search(url) else 0
             features['Symbol@'] = 1 if '@' in url else 0
-            features['PrefixSuffix-'] = 1 if '-' in urlparse(url).netloc else 0
+            features['PrefixSuffix-'] = 1 if '-' in parsed_url.netloc else 0
             features['has_ip'] = features['UsingIP']  # Compatibility
             features['has_at_symbol'] = features['Symbol@']  # Compatibility
 
-            # domain analysis
-            domain, full_domain = FeatureExtractor.get_domain(url)
+            # domain analysis - split the host once, everything below reuses it
+            extracted = extract_domain_parts(url)
+            domain, full_domain = FeatureExtractor.get_domain_from_parts(extracted)
             if not domain:
-                return FeatureExtractor.get_default_features()
+                return FeatureExtractor.get_default_features(), False
+
+            # start dns and whois now so they run together while the string features are computed
+            dns_future = _IO_POOL.submit(FeatureExtractor._get_dns_records, domain)
+            whois_future = _IO_POOL.submit(FeatureExtractor.get_domain_info, domain)
 
-            extracted = tldextract.extract(url)
             subdomain_parts = extracted.subdomain.split('.') if extracted.subdomain else []
             features['SubDomains'] = len(subdomain_parts)
             features['subdomain_count'] = features['SubDomains']  # Compatibility
@@ -683,146 +1086,71 @@ class FeatureExtractor:
             features['has_hyphen_in_domain'] = 1 if '-' in domain_name else 0
             features['multiple_hyphens'] = 1 if domain_name.count('-') > 1 else 0
 
-            digit_ratio = sum(c.isdigit() for c in domain_name) / max(len(domain_name), 1)
+            domain_entropy, digit_count = char_stats(domain_name)
+            digit_ratio = digit_count / max(len(domain_name), 1)
             features['high_digit_ratio'] = 1 if digit_ratio > 0.2 else 0
 
             # tld analysis
-            ultra_suspicious_tlds = [
-                'tk', 'ml', 'ga', 'cf', 'gq', 'top', 'click', 'download',
-                'link', 'info', 'biz', 'xyz', 'club', 'online', 'site',
-                'website', 'space', 'tech', 'store', 'shop', 'win', 'vip',
-                'icu', 'rest', 'cc', 'sbs', 'world', 'support'
-            ]
-            features['suspicious_tld'] = 1 if extracted.suffix in ultra_suspicious_tlds else 0
+            features['suspicious_tld'] = 1 if extracted.suffix in ULTRA_SUSPICIOUS_TLDS else 0
 
             # url structure analysis
             features['url_length'] = len(url)
             features['extremely_long_url'] = 1 if len(url) > 100 else 0
             features['suspicious_url_length'] = 1 if len(url) > 75 else 0
 
-            path_parts = urlparse(url).path.split('/')
+            path_parts = parsed_url.path.split('/')
             features['deep_path'] = 1 if len(path_parts) > 4 else 0
-            features['path_length'] = len(urlparse(url).path)
+            features['path_length'] = len(parsed_url.path)
 
-            query = urlparse(url).query
+            query = parsed_url.query
             features['query_length'] = len(query)
             features['long_query'] = 1 if len(query) > 30 else 0
 
-            # whois information
-            whois_info = FeatureExtractor.get_domain_info(domain)
-            features['DomainRegLen'] = 1 if whois_info['registration_length'] > 365 else 0
-            features['AgeofDomain'] = 1 if whois_info['domain_age'] > 180 else 0
-
-            # dns features 
-            dns_info = FeatureExtractor.get_dns_records(domain)
-            features['DNSRecording'] = 1 if dns_info['has_a'] and dns_info['has_ns'] else 0
-            features['WebsiteTraffic'] = 1 if dns_info['total_records'] > 3 else 0
-            features['PageRank'] = 1 if dns_info['has_a'] and dns_info['has_mx'] and dns_info['has_ns'] else 0
-            features['GoogleIndex'] = 1 if dns_info['has_a'] and dns_info['has_ns'] else 0
-            features['LinksPointingToPage'] = 1 if whois_info['domain_age'] > 365 else 0
-            features['StatsReport'] = 1 if whois_info['domain_age'] > 180 and dns_info['total_records'] > 3 else 0
-
-            # phishing keywords 
-            ultra_phishing_keywords = [
-                'verify', 'secure', 'login', 'signin', 'account', 'update', 'confirm',
-                'suspended', 'locked', 'expired', 'urgent', 'immediate', 'security',
-                'alert', 'warning', 'action', 'required', 'validation', 'authenticate',
-                'verification', 'restore', 'unlock', 'resolve', 'customer',
-                'banking', 'payment', 'billing', 'invoice', 'transaction', 'refund',
-                'card', 'credit', 'debit', 'wallet', 'paypal', 'stripe',
-                'support', 'service', 'center', 'portal', 'help', 'notification'
-            ]
-
-            keyword_count = sum(1 for kw in ultra_phishing_keywords if kw in url.lower())
+            # phishing keywords - distinct keywords present anywhere in the url
+            keyword_count = len(set(_PHISHING_KEYWORD_RE.findall(url_lower)))
             features['keyword_count'] = keyword_count
             features['has_phishing_keywords'] = 1 if keyword_count >= 1 else 0
             features['multiple_phishing_keywords'] = 1 if keyword_count >= 2 else 0
 
             # brand impersonation 
-            major_brands = [
-                'google', 'microsoft', 'apple', 'amazon', 'facebook', 'meta',
-                'instagram', 'twitter', 'linkedin', 'youtube', 'netflix', 'spotify',
-                'adobe', 'zoom', 'dropbox', 'gmail', 'outlook', 'icloud',
-                'paypal', 'stripe', 'visa', 'mastercard', 'amex', 'discover',
-                'chase', 'wells', 'bofa', 'citi', 'usbank', 'hsbc', 'td',
-                'bankofamerica', 'wellsfargo', 'citibank', 'pnc', 'capitalone',
-                'bank', 'credit', 'union', 'financial', 'banking'
-            ]
-
-            brand_count = sum(1 for brand in major_brands if brand in domain_name)
-            features['has_brand_impersonation'] = 1 if brand_count > 0 else 0
+            features['has_brand_impersonation'] = 1 if _BRAND_RE.search(domain_name) else 0
 
             # typosquatting detection 
             typosquatting = FeatureExtractor.detect_advanced_typosquatting(domain)
             features['IsTyposquatting'] = 1 if typosquatting['is_typosquatting'] else 0
 
             # subdomain brand analysis 
-            subdomain_analysis = FeatureExtractor.detect_brand_in_subdomain(url)
+            subdomain_analysis = FeatureExtractor.detect_brand_in_subdomain(url, extracted)
             features['BrandInSubdomain'] = 1 if subdomain_analysis['has_brand_in_subdomain'] else 0
 
             # suspicious domain patterns
-            suspicious_domain_patterns = [
-                'verification', 'security', 'account', 'update', 'confirm',
-                'locked', 'suspended', 'expired', 'urgent', 'immediate',
-                'customer', 'support', 'service', 'center', 'portal'
-            ]
-            domain_pattern_count = sum(1 for pattern in suspicious_domain_patterns if pattern in domain_name)
-            features['has_suspicious_domain_pattern'] = 1 if domain_pattern_count > 0 else 0
+            features['has_suspicious_domain_pattern'] = 1 if _SUSPICIOUS_PATTERN_RE.search(domain_name) else 0
 
             # url shotner detection
-            shorteners = [
-                'bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'is.gd',
-                'buff.ly', 'adf.ly', 'short.link', 'tiny.cc', 'rb.gy',
-                'cutt.ly', 'bitly.com', 'short.io', 'rebrand.ly'
-            ]
-            features['is_shortener'] = 1 if any(s in domain for s in shorteners) else 0
+            features['is_shortener'] = 1 if _SHORTENER_RE.search(domain) else 0
 
             # suspicious characters
-            features['has_double_slash'] = 1 if '//' in url[8:] else 0
+            features['has_double_slash'] = 1 if url.find('//', 8) != -1 else 0
 
-            special_char_count = len(re.findall(r'[%\-_=&\?]', url))
+            url_bytes = url.encode('utf-8', 'surrogatepass')
+            special_char_count = len(url_bytes) - len(url_bytes.translate(None, _SPECIAL_CHAR_BYTES))
             features['special_char_density'] = special_char_count / len(url) if len(url) > 0 else 0
             features['high_special_char_density'] = 1 if features['special_char_density'] > 0.1 else 0
 
             # advanced detection
-            # entropy analysis
-            def calculate_entropy(text):
-                if not text:
-                    return 0
-                char_counts = {}
-                for char in text.lower():
-                    char_counts[char] = char_counts.get(char, 0) + 1
-
-                length = len(text)
-                entropy = 0
-                for count in char_counts.values():
-                    if count > 0:
-                        p = count / length
-                        entropy -= p * math.log2(p)
-                return entropy
-
-            domain_entropy = calculate_entropy(domain_name)
+            # entropy analysis (computed alongside the digit ratio above)
             features['high_domain_entropy'] = 1 if domain_entropy > 3.0 else 0
 
             # homograph detection
-            features['homograph_risk'] = 1 if any(ord(c) > 127 for c in domain_name) else 0
+            features['homograph_risk'] = 0 if domain_name.isascii() else 1
 
             # advanced typosquatting patterns
-            typosquatting_indicators = [
-                domain_name.count('0') > 0 and 'o' in domain_name,
-                domain_name.count('1') > 0 and 'l' in domain_name,
-                domain_name.count('5') > 0 and 's' in domain_name,
-            ]
-            features['potential_typosquatting'] = 1 if any(typosquatting_indicators) else 0
-
-            # html content analysis
-            features['RequestURL'] = 0  # default
-            if url.startswith('http'):
-                try:
-                    html_info = FeatureExtractor.analyze_html_content(url)
-                    features['RequestURL'] = 1 if html_info['external_scripts'] > 0 else 0
-                except Exception as e:
-                    logger.debug(f"HTML analysis error for {url}: {str(e)}")
+            # stops at the first digit/letter pair found, most names have none of the digits
+            features['potential_typosquatting'] = 1 if (
+                ('0' in domain_name and 'o' in domain_name)
+                or ('1' in domain_name and 'l' in domain_name)
+                or ('5' in domain_name and 's' in domain_name)
+            ) else 0
 
             # combined risk indicators
             critical_risk_factors = [
@@ -839,6 +1167,54 @@ class FeatureExtractor:
             features['multiple_critical_risks'] = 1 if features['risk_factor_count'] >= 2 else 0
             features['ultra_high_risk'] = 1 if features['risk_factor_count'] >= 3 else 0
 
+            # the page fetch is the slowest lookup - skip it when the url alone already
+            # marks the site ultra high risk, since the html cannot change the verdict
+            html_future = None
+            if url.startswith('http') and not features['ultra_high_risk']:
+                html_future = _IO_POOL.submit(FeatureExtractor.analyze_html_content, url)
+
+            # dns features (looked up first so dead domains can skip whois)
+            dns_result = FeatureExtractor._await_lookup(dns_future, FeatureExtractor._get_dns_records, domain)
+            if dns_result is None:
+                dns_info, complete = FeatureExtractor.get_default_dns_records(), False
+            else:
+                dns_info, complete = dns_result
+
+            # whois information - a domain with neither A nor NS records is not
+            # live, so don't wait on the slow registrar query, it would only
+            # return the defaults (and drop it if it has not started yet)
+            if dns_info['has_a'] or dns_info['has_ns']:
+                whois_info = FeatureExtractor._await_lookup(whois_future, FeatureExtractor.get_domain_info, domain)
+                if whois_info is None:
+                    whois_info = FeatureExtractor.get_default_domain_info()
+                    complete = False
+            else:
+                logger.debug(f"Skipping WHOIS for non-resolving domain: {domain}")
+                whois_future.cancel()
+                whois_info = FeatureExtractor.get_default_domain_info()
+            features['DomainRegLen'] = 1 if whois_info['registration_length'] > 365 else 0
+            features['AgeofDomain'] = 1 if whois_info['domain_age'] > 180 else 0
+            # raw values for the deep analysis report, so it does not repeat the lookup
+            features['domain_age_days'] = whois_info['domain_age']
+            features['registration_length_days'] = whois_info['registration_length']
+
+            features['DNSRecording'] = 1 if dns_info['has_a'] and dns_info['has_ns'] else 0
+            features['WebsiteTraffic'] = 1 if dns_info['total_records'] > 3 else 0
+            features['PageRank'] = 1 if dns_info['has_a'] and dns_info['has_mx'] and dns_info['has_ns'] else 0
+            features['GoogleIndex'] = 1 if dns_info['has_a'] and dns_info['has_ns'] else 0
+            features['LinksPointingToPage'] = 1 if whois_info['domain_age'] > 365 else 0
+            features['StatsReport'] = 1 if whois_info['domain_age'] > 180 and dns_info['total_records'] > 3 else 0
+
+            # html content analysis
+            features['RequestURL'] = 0  # default
+            if html_future is not None:
+                try:
+                    html_info = html_future.result(timeout=IO_TIMEOUT)
+                    features['RequestURL'] = 1 if html_info['external_scripts'] > 0 else 0
+                except Exception as e:
+                    logger.debug(f"HTML analysis error for {url}: {str(e)}")
+                    complete = False
+
             # legacy compatibility
             features['AbnormalURL'] = features['has_phishing_keywords']
 
@@ -857,7 +1233,7 @@ class FeatureExtractor:
 
             # negative indicators
             if features['uses_http'] == 1:
-                if any(domain.endswith(white_domain) for white_domain in HTTP_WHITELIST):
+                if is_domain_whitelisted(domain):
                     pass  # no penalty for whitelisted sites
                 else:
                     legitimacy_score -= 0.2
@@ -872,19 +1248,29 @@ class FeatureExtractor:
             features['LegitimacyScore'] = max(0, min(1, legitimacy_score))
 
             # handle special whitelisted cases
-            if features['uses_http'] == 1 and any(domain.endswith(white) for white in HTTP_WHITELIST):
+            if features['uses_http'] == 1 and is_domain_whitelisted(domain):
                 features['LegitimacyScore'] = 0.8
 
-            return features
+            return features, complete
 
         except Exception as e:
             logger.error(f"Error extracting features from {url}: {str(e)}")
-            return FeatureExtractor.get_default_features()
+            return FeatureExtractor.get_default_features(), False
     
     @staticmethod
     def prepare_features_for_model(features: Dict[str, Any], feature_list: List[str]) -> np.ndarray:
-        feature_array = []
-        for feature_name in feature_list:
-            feature_array.append(features.get(feature_name, 0))
-            
-        return np.array(feature_array).reshape(1, -1)
\ No newline at end of file
+        # one list in the correct order, converted straight into a (1, N) row.
+        # stays float64: the scaler runs in the input dtype, and float32 rounding
+        # before scaling can move a value across a tree threshold
+        return np.array(
+            [[features.get(feature_name, 0) for feature_name in feature_list]],
+            dtype=np.float64
+        )
+
+    @staticmethod
+    def prepare_features_batch(features_batch: List[Dict[str, Any]], feature_list: List[str]) -> np.ndarray:
+        """stack several feature dicts into one (B, N) model input for a single predict call"""
+        X = np.empty((len(features_batch), len(feature_list)), dtype=np.float64)
+        for row, features in zip(X, features_batch):
+            row[:] = [features.get(feature_name, 0) for feature_name in feature_list]
+        return X
\ No newline at end of file
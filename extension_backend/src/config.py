@@ -1,4 +1,5 @@
 import os
+import re
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -38,11 +39,20 @@ API_HOST = os.getenv("API_HOST_BE")
 API_PORT = int(os.getenv("API_PORT_BE"))
 
 # CORS settings
-CORS_ORIGINS = [
+_CORS_ORIGIN_SETTINGS = [
     os.getenv("CHROME_EXTENSION"),  # allow Chrome extensions
     os.getenv("WEB_CLIENT_URL"),  # frontend 
     os.getenv("EXTENSION_BACKEND_URL"),  # testing
 ]
+# exact origins are a plain list lookup; wildcard entries such as
+# chrome-extension://* never match literally, so they go into one regex that
+# starlette compiles once at startup
+CORS_ORIGINS = [origin for origin in _CORS_ORIGIN_SETTINGS if origin and '*' not in origin]
+_CORS_ORIGIN_PATTERNS = [
+    '[^/]*'.join(re.escape(part) for part in origin.rstrip('/').split('*')) + '/?'
+    for origin in _CORS_ORIGIN_SETTINGS if origin and '*' in origin
+]
+CORS_ORIGIN_REGEX = '|'.join(_CORS_ORIGIN_PATTERNS) or None
 
 # security settings
 API_KEY_HEADER = "X-API-Key"
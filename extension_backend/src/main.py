@@ -1,12 +1,18 @@
+import os
+
+# same defaults as the docker image when run directly, they only take effect
+# if set before numpy is first imported
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
 import time
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import logging
-import os
 import uvicorn
 
-from .config import API_PREFIX, API_DEBUG, API_HOST, API_PORT, CORS_ORIGINS
+from .config import API_PREFIX, API_DEBUG, API_HOST, API_PORT, CORS_ORIGINS, CORS_ORIGIN_REGEX
 from .logging_config import get_logger
 from .routers import url_analyzer
 from .services.model_service import ModelService
@@ -26,6 +32,7 @@ app = FastAPI(
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
+    allow_origin_regex=CORS_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -66,6 +73,13 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "An unexpected error occurred"}
     )
 
+# load the model and warm the extraction path before the first request arrives
+@app.on_event("startup")
+async def startup_event():
+    """Run on application startup"""
+    logger.info("Loading and warming up model service...")
+    ModelService().warmup()
+
 # include routers
 app.include_router(url_analyzer.router, prefix=API_PREFIX)
 
@@ -32,8 +32,9 @@ class URLAnalysisResponse(BaseModel):
     threat_score: int = Field(..., ge=0, le=100)
     probability: float = Field(..., ge=0, le=1)
     details: str
-    features_used: Optional[List[str]] = None
+    features_used: Optional[List[str]] = None  # no longer filled in, kept for older clients
     model_version: str
+    heuristic_override: bool = False  # decided by critical indicators, not the model
     
     class Config:
         schema_extra = {
@@ -43,11 +44,40 @@ class URLAnalysisResponse(BaseModel):
                 "threat_score": 15,
                 "probability": 0.15,
                 "details": "This URL has been analyzed and appears to be legitimate.",
-                "features_used": ["url_length", "num_dots", "num_special_chars"],
-                "model_version": "random_forest_model_lite"
+                "model_version": "random_forest_model_lite",
+                "heuristic_override": False
             }
         }
 
+# most urls accepted in one batch request, each one costs a rate limit token
+MAX_BATCH_URLS = 50
+
+class BatchURLAnalysisRequest(BaseModel):
+    urls: List[str]
+    client: Optional[str] = "unknown"
+    
+    @validator('urls')
+    def validate_urls(cls, v):
+        if not v:
+            raise ValueError('At least one URL is required')
+        if len(v) > MAX_BATCH_URLS:
+            raise ValueError(f'At most {MAX_BATCH_URLS} URLs can be analyzed per request')
+        for url in v:
+            if not validators.url(url):
+                raise ValueError(f'Invalid URL format: {url[:50]}')
+        return v
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "urls": ["https://example.com", "http://examp1e-login.xyz/verify"],
+                "client": "browser_extension"
+            }
+        }
+
+class BatchURLAnalysisResponse(BaseModel):
+    results: List[URLAnalysisResponse]
+
 class ErrorResponse(BaseModel):
     detail: str
     
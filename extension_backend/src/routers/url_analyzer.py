@@ -1,44 +1,101 @@
 from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import itertools
 import time
 
 from ..logging_config import get_logger
-from ..models.schemas import URLAnalysisRequest, URLAnalysisResponse, ErrorResponse
+from ..models.schemas import (
+    URLAnalysisRequest, URLAnalysisResponse, BatchURLAnalysisRequest, BatchURLAnalysisResponse, ErrorResponse
+)
 from ..services.model_service import ModelService
+from ..services.prediction_batcher import PredictionBatcher
 from ..utils.feature_extraction import FeatureExtractor
 
 logger = get_logger(__name__)
 
 router = APIRouter(tags=["URL Analysis"])
 
-# rate limiting tracker
-request_counters: Dict[str, Dict[str, int]] = {}
+# rate limiting: one token bucket per client ip, (tokens left, last refill time).
+# the dependency never awaits, so updates can't interleave on the event loop
+rate_buckets: Dict[str, Tuple[float, float]] = {}
+MAX_TRACKED_CLIENTS = 10000
+
+def _prune_rate_buckets(now: float, limit: int) -> None:
+    """drop buckets that have refilled completely - they behave like new clients"""
+    refill_rate = limit / 60.0
+    for ip, (tokens, last) in list(rate_buckets.items()):
+        if tokens + (now - last) * refill_rate >= limit:
+            del rate_buckets[ip]
+
+    # still too many active clients, forget the oldest down to half the cap so
+    # the next prune isn't triggered by the very next new client
+    excess = len(rate_buckets) - MAX_TRACKED_CLIENTS // 2
+    if excess > 0 and len(rate_buckets) > MAX_TRACKED_CLIENTS:
+        for ip in list(itertools.islice(rate_buckets, excess)):
+            del rate_buckets[ip]
+
+# recent responses keyed by the exact url (case and fragment change the features),
+# so reloads and repeat checks from open tabs skip extraction and the model.
+# only touched from the event loop, like the rate buckets
+PREDICTION_CACHE_TTL = 60  # seconds
+PREDICTION_CACHE_SIZE = 10000
+prediction_cache: "OrderedDict[str, Tuple[float, URLAnalysisResponse]]" = OrderedDict()
+
+def _get_cached_prediction(url: str) -> Optional[URLAnalysisResponse]:
+    entry = prediction_cache.get(url)
+    if entry is None:
+        return None
+    expires_at, response = entry
+    if expires_at < time.monotonic():
+        del prediction_cache[url]
+        return None
+    return response
+
+def _cache_prediction(url: str, response: URLAnalysisResponse) -> None:
+    prediction_cache[url] = (time.monotonic() + PREDICTION_CACHE_TTL, response)
+    prediction_cache.move_to_end(url)
+    while len(prediction_cache) > PREDICTION_CACHE_SIZE:
+        prediction_cache.popitem(last=False)
+
+def _consume_rate_limit(client_ip: str, cost: int = 1, limit: int = 60) -> None:
+    """take cost tokens from the client's bucket, 429 when there aren't enough"""
+    now = time.monotonic()
+
+    # refill at limit tokens per minute, capped at a full bucket
+    tokens, last = rate_buckets.get(client_ip, (float(limit), now))
+    tokens = min(float(limit), tokens + (now - last) * limit / 60.0)
 
-# rate limiting dependency
-async def check_rate_limit(request: Request, limit: int = 60):
-    client_ip = request.client.host
-    current_minute = int(time.time() / 60)
-    
-    # initialize counter for this minute if needed
-    if current_minute not in request_counters:
-        request_counters.clear()  # Clear old data
-        request_counters[current_minute] = {}
-    
-    # initialize counter for this client if needed
-    if client_ip not in request_counters[current_minute]:
-        request_counters[current_minute][client_ip] = 0
-    
     # check if limit exceeded
-    if request_counters[current_minute][client_ip] >= limit:
+    if tokens < cost:
+        rate_buckets[client_ip] = (tokens, now)
         logger.warning(f"Rate limit exceeded for {client_ip}")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded"
         )
-    
-    # increment counter
-    request_counters[current_minute][client_ip] += 1
+
+    # take the tokens
+    rate_buckets[client_ip] = (tokens - cost, now)
+    if len(rate_buckets) > MAX_TRACKED_CLIENTS:
+        _prune_rate_buckets(now, limit)
+
+# rate limiting dependency
+async def check_rate_limit(request: Request, limit: int = 60):
+    _consume_rate_limit(request.client.host, 1, limit)
+
+def _to_response(url: str, result: Dict[str, Any]) -> URLAnalysisResponse:
+    return URLAnalysisResponse(
+        url=url,
+        is_phishing=result.get("is_phishing", False),
+        threat_score=result.get("threat_score", 0),
+        probability=result.get("probability", 0.0),
+        details=result.get("details", "URL analyzed successfully"),
+        model_version=result.get("model_version", "unknown"),
+        heuristic_override=result.get("heuristic_override", False)
+    )
 
 @router.post(
     "/analyze-url",
@@ -58,15 +115,18 @@ async def analyze_url(
     
     try:
         logger.info(f"Analyzing URL: {request_data.url[:50]}... from client: {request_data.client}")
-        
-        # get model service (singleton)
-        model_service = ModelService()
+
+        cached = _get_cached_prediction(request_data.url)
+        if cached is not None:
+            logger.info(f"Returning cached analysis for URL: {request_data.url[:50]}...")
+            return cached
         
         # use client-provided features or extract them
         features = FeatureExtractor.extract_features(request_data.url)
         
-        # make prediction
-        result = model_service.predict(request_data.url, features)
+        # make prediction - batched with other in-flight requests and run off the
+        # event loop so scoring the batch does not stall other requests
+        result = await PredictionBatcher().predict(request_data.url, features)
         
         # log result
         process_time = time.time() - start_time
@@ -80,15 +140,13 @@ async def analyze_url(
         )
         
         # return response
-        return URLAnalysisResponse(
-            url=request_data.url,
-            is_phishing=is_phishing,
-            threat_score=threat_score,
-            probability=result.get("probability", 0.0),
-            details=result.get("details", "URL analyzed successfully"),
-            features_used=result.get("features_used", None),
-            model_version=result.get("model_version", "unknown")
-        )
+        response = _to_response(request_data.url, result)
+
+        # don't keep the fallback answer given when the model is unavailable or fails
+        if not result.get("error"):
+            _cache_prediction(request_data.url, response)
+
+        return response
         
     except ValueError as e:
         logger.warning(f"Invalid request for URL analysis: {str(e)}")
@@ -102,4 +160,53 @@ async def analyze_url(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while analyzing the URL"
-        )
\ No newline at end of file
+        )
+
+@router.post(
+    "/analyze-urls",
+    response_model=BatchURLAnalysisResponse,
+    responses={
+        status.HTTP_429_TOO_MANY_REQUESTS: {"model": ErrorResponse},
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorResponse},
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": ErrorResponse}
+    }
+)
+async def analyze_urls(request_data: BatchURLAnalysisRequest, request: Request):
+    """analyze several urls (e.g. all links on a page) with one model call"""
+    # every url in the batch counts against the client's rate limit
+    _consume_rate_limit(request.client.host, len(request_data.urls))
+    start_time = time.time()
+
+    try:
+        logger.info(f"Analyzing batch of {len(request_data.urls)} URLs from client: {request_data.client}")
+
+        responses: Dict[str, URLAnalysisResponse] = {}
+        pending = []
+        for url in dict.fromkeys(request_data.urls):
+            cached = _get_cached_prediction(url)
+            if cached is not None:
+                responses[url] = cached
+            else:
+                pending.append(url)
+
+        if pending:
+            model_service = ModelService()
+            # extraction and scoring block, keep them off the event loop
+            results = await asyncio.to_thread(model_service.predict_batch, pending)
+            for url, result in zip(pending, results):
+                responses[url] = _to_response(url, result)
+                if not result.get("error"):
+                    _cache_prediction(url, responses[url])
+
+        logger.info(
+            f"Batch analysis complete: {len(pending)} scored, "
+            f"{len(responses) - len(pending)} cached, time={time.time() - start_time:.4f}s"
+        )
+        return BatchURLAnalysisResponse(results=[responses[url] for url in request_data.urls])
+
+    except Exception as e:
+        logger.error(f"Error analyzing URL batch: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while analyzing the URLs"
+        )
@@ -1,14 +1,25 @@
 import requests
-import json
-import time
-from typing import Dict, Any, List
-import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import queue
+import threading
+from typing import Dict, Any, Tuple
 
 from ..logging_config import get_logger
 from ..config import WEB_SERVER_DOCKER_API
 
 logger = get_logger(__name__)
 
+# (connect, read) timeout for calls to the web server, so a stalled server
+# can't hold up a prediction
+DB_REQUEST_TIMEOUT = (1.0, 3.0)
+
+# writes waiting for the background worker, anything past this is dropped
+DB_QUEUE_SIZE = 1024
+# writes the worker sends back to back before blocking on the queue again
+DB_DRAIN_BATCH_SIZE = 32
+
 class DatabaseIntegrationService:
     """service for integrating extension data with the database"""
     _instance = None
@@ -24,28 +35,84 @@ class DatabaseIntegrationService:
             return
             
         self._initialized = True
+
+        # one pooled session so calls reuse the keep-alive connection instead of
+        # opening a new one every time. urllib3 only retries POSTs on connection
+        # errors, status retries apply to idempotent methods
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({"Content-Type": "application/json"})
+
+        # analysis, evaluation and log writes are queued and sent by a daemon
+        # thread so predictions don't wait on the web server
+        self._queue: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue(maxsize=DB_QUEUE_SIZE)
+        self._dropped = 0
+        self._senders = {
+            "url_analysis": self._post_url_analysis,
+            "system_event": self._post_system_event,
+            "model_evaluation": self._post_model_evaluation,
+        }
+        self._worker = threading.Thread(target=self._drain, name="db-integration", daemon=True)
+        self._worker.start()
+
+    def _enqueue(self, op: str, data: Dict[str, Any]) -> bool:
+        """queue a write for the worker, False when the queue is full"""
+        try:
+            self._queue.put_nowait((op, data))
+            return True
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 100 == 0:
+                logger.warning(f"Database write queue full, dropped {self._dropped} writes so far")
+            return False
+
+    def _drain(self) -> None:
+        """send queued writes, a burst at a time over the pooled connection"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < DB_DRAIN_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for op, data in batch:
+                # the senders log their own failures, this only keeps the worker alive
+                try:
+                    self._senders[op](data)
+                except Exception as e:
+                    logger.error(f"Error sending queued {op} write: {str(e)}")
         
     def save_url_analysis(self, url_data: Dict[str, Any], features: Dict[str, Any] = None) -> bool:
-        """save URL analysis to the database via the API="""
+        """queue a URL analysis to be saved to the database via the API"""
+        # extract the needed data 
+        data = {
+            "url": url_data.get("url"),
+            "is_phishing": url_data.get("is_phishing"),
+            "threat_score": url_data.get("threat_score", 0),
+            "source": "browser_extension",
+            "features": features or {}
+        }
+        return self._enqueue("url_analysis", data)
+
+    def _post_url_analysis(self, data: Dict[str, Any]) -> bool:
+        """save URL analysis to the database via the API"""
         try:
-            # extract the needed data 
-            data = {
-                "url": url_data.get("url"),
-                "is_phishing": url_data.get("is_phishing"),
-                "threat_score": url_data.get("threat_score", 0),
-                "source": "browser_extension",
-                "features": features or {}
-            }
-            
             # make API call to save the data
-            response = requests.post(
+            response = self._session.post(
                 f"{WEB_SERVER_DOCKER_API}/url/save-analysis",
-                json=data,
-                headers={"Content-Type": "application/json"}
+                data=orjson.dumps(data),
+                timeout=DB_REQUEST_TIMEOUT
             )
             
             if response.status_code == 200:
-                logger.info(f"Saved analysis for URL {url_data.get('url')[:30]}... to database")
+                logger.info(f"Saved analysis for URL {(data.get('url') or '')[:30]}... to database")
                 return True
             else:
                 logger.error(f"Failed to save analysis to database: {response.status_code}")
@@ -67,10 +134,10 @@ class DatabaseIntegrationService:
             }
             
             # make API call to save the data
-            response = requests.post(
+            response = self._session.post(
                 f"{WEB_SERVER_DOCKER_API}/url/report",
-                json=data,
-                headers={"Content-Type": "application/json"}
+                data=orjson.dumps(data),
+                timeout=DB_REQUEST_TIMEOUT
             )
             
             return response.status_code == 200 or response.status_code == 201
@@ -79,19 +146,22 @@ class DatabaseIntegrationService:
             return False
     
     def log_system_event(self, level: str, message: str, metadata: Dict[str, Any] = None) -> bool:
+        """queue a system event to be logged to the database"""
+        data = {
+            "component": "extension_backend",
+            "logLevel": level,
+            "message": message,
+            "metadata": orjson.dumps(metadata).decode() if metadata else None
+        }
+        return self._enqueue("system_event", data)
+
+    def _post_system_event(self, data: Dict[str, Any]) -> bool:
         """log a system event to the database"""
         try:
-            data = {
-                "component": "extension_backend",
-                "logLevel": level,
-                "message": message,
-                "metadata": json.dumps(metadata) if metadata else None
-            }
-            
-            response = requests.post(
+            response = self._session.post(
                 f"{WEB_SERVER_DOCKER_API}/url/log/system",
-                json=data,
-                headers={"Content-Type": "application/json"}
+                data=orjson.dumps(data),
+                timeout=DB_REQUEST_TIMEOUT
             )
             
             return response.status_code == 200
@@ -109,10 +179,10 @@ class DatabaseIntegrationService:
                 "parameters": model_data.get("parameters")
             }
             
-            response = requests.post(
+            response = self._session.post(
                 f"{WEB_SERVER_DOCKER_API}/url/model/register",
-                json=data,
-                headers={"Content-Type": "application/json"}
+                data=orjson.dumps(data),
+                timeout=DB_REQUEST_TIMEOUT
             )
             
             if response.status_code == 200:
@@ -126,19 +196,22 @@ class DatabaseIntegrationService:
             return False
     
     def track_lightweight_model_evaluation(self, eval_data: Dict[str, Any]) -> bool:
+        """queue a model evaluation to be tracked"""
+        data = {
+            "model_name": eval_data.get("model_name"),
+            "url": eval_data.get("url"),
+            "predicted_score": eval_data.get("score"),
+            "actual_label": eval_data.get("actual_label", None)
+        }
+        return self._enqueue("model_evaluation", data)
+
+    def _post_model_evaluation(self, data: Dict[str, Any]) -> bool:
         """track a model evaluation"""
         try:
-            data = {
-                "model_name": eval_data.get("model_name"),
-                "url": eval_data.get("url"),
-                "predicted_score": eval_data.get("score"),
-                "actual_label": eval_data.get("actual_label", None)
-            }
-            
-            response = requests.post(
+            response = self._session.post(
                 f"{WEB_SERVER_DOCKER_API}/url/evaluation",
-                json=data,
-                headers={"Content-Type": "application/json"}
+                data=orjson.dumps(data),
+                timeout=DB_REQUEST_TIMEOUT
             )
             
             return response.status_code == 200
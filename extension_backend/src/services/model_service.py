@@ -1,17 +1,33 @@
 import joblib
 import json
 import numpy as np
+import orjson
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 import os
+import threading
+import time
+from collections import OrderedDict
+from operator import itemgetter
 
 from ..config import BROWSER_EXTENSION_MODEL_PATH, BROWSER_EXTENSION_SCALER_PATH, FEATURE_LIST_PATH
 from ..logging_config import get_logger
-from ..utils.feature_extraction import FeatureExtractor
+from ..utils.feature_extraction import FeatureExtractor, FEATURE_NAMES
+from ..utils.forest import FlatForest
 from .database_integration_service import DatabaseIntegrationService
 
 logger = get_logger(__name__)
 
+# results of predict calls that extracted their own features, keyed by url.
+# the ttl lets threshold or model changes show up without a restart
+PREDICT_CACHE_SIZE = 4096
+PREDICT_CACHE_TTL = 300  # seconds
+
+# urls with any of these flags are reported as phishing whatever the model says,
+# so they skip the forest and are scored at a fixed probability instead
+CRITICAL_INDICATORS = ('has_ip', 'ultra_high_risk', 'multiple_critical_risks')
+CRITICAL_OVERRIDE_PROBABILITY = 0.9
+
 class ModelService:
     """
     service for loading and using ML models for phishing detection
@@ -31,8 +47,24 @@ class ModelService:
             
         self._initialized = True
         self.model = None
+        # flattened copy of the forest used for predict_proba, None falls back to sklearn
+        self.forest = None
         self.scaler = None
+        # standard scaler parameters for scaling rows in place without sklearn's
+        # per-call validation, None when the scaler is anything else
+        self._scaler_mean = None
+        self._scaler_scale = None
         self.feature_list = []
+        # pulls every feature in feature_list order out of a dict in one C call
+        self._feature_getter = None
+        # url -> (expiry time, result), oldest first; predict runs on worker threads
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # per-thread (1, n_features) input row reused across predict calls,
+        # predictions run concurrently on the batcher's worker threads
+        self._tls = threading.local()
+        # set once the background database registration has been started
+        self._registration_started = threading.Event()
         self.model_info = {
             "name": "browser_extension_random_forest",
             "type": "random_forest",
@@ -52,17 +84,26 @@ class ModelService:
             # load model
             logger.info(f"Loading model from {BROWSER_EXTENSION_MODEL_PATH}")
             self.model = joblib.load(BROWSER_EXTENSION_MODEL_PATH)
+            # trained with n_jobs=-1, which makes every sklearn predict_proba call spin up
+            # a thread pool - far more overhead than a handful of rows is worth
+            if hasattr(self.model, 'n_jobs'):
+                self.model.n_jobs = 1
+            self.forest = FlatForest.from_model(self.model)
             
             # load scaler if available
             if os.path.exists(BROWSER_EXTENSION_SCALER_PATH):
                 logger.info(f"Loading scaler from {BROWSER_EXTENSION_SCALER_PATH}")
                 self.scaler = joblib.load(BROWSER_EXTENSION_SCALER_PATH)
+                if (getattr(self.scaler, 'with_mean', False) and getattr(self.scaler, 'with_std', False)
+                        and getattr(self.scaler, 'mean_', None) is not None
+                        and getattr(self.scaler, 'scale_', None) is not None):
+                    self._scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+                    self._scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
             
             # load feature list if available
             if os.path.exists(FEATURE_LIST_PATH):
                 logger.info(f"Loading feature list from {FEATURE_LIST_PATH}")
-                with open(FEATURE_LIST_PATH, 'r') as f:
-                    metadata = json.load(f)
+                metadata = orjson.loads(Path(FEATURE_LIST_PATH).read_bytes())
                 
                 # Try to extract the 33 features from ultra-high recall metadata
                 if "features" in metadata and "feature_list" in metadata["features"]:
@@ -73,39 +114,47 @@ class ModelService:
                     logger.info(f"Loaded {len(self.feature_list)} features from metadata")
                 else:
                     logger.warning("No features found in metadata, using ultra-high recall default")
-                    self.feature_list = [
-                        'has_ip', 'has_https', 'suspicious_tld', 'domain_length',
-                        'subdomain_count', 'excessive_subdomains', 'ultra_excessive_subdomains',
-                        'has_hyphen_in_domain', 'multiple_hyphens', 'high_digit_ratio', 'high_domain_entropy',
-                        'url_length', 'extremely_long_url', 'suspicious_url_length', 'deep_path', 'long_query',
-                        'path_length', 'query_length', 'keyword_count', 'has_phishing_keywords',
-                        'multiple_phishing_keywords', 'has_brand_impersonation', 'has_suspicious_domain_pattern',
-                        'is_shortener', 'has_at_symbol', 'has_double_slash', 'special_char_density',
-                        'high_special_char_density', 'homograph_risk', 'potential_typosquatting',
-                        'risk_factor_count', 'multiple_critical_risks', 'ultra_high_risk'
-                    ]
+                    self.feature_list = list(FEATURE_NAMES)
             else:
                 # Ultra-high recall default features (33 features)
                 logger.warning("Feature list file not found, using ultra-high recall default")
-                self.feature_list = [
-                    'has_ip', 'has_https', 'suspicious_tld', 'domain_length',
-                    'subdomain_count', 'excessive_subdomains', 'ultra_excessive_subdomains',
-                    'has_hyphen_in_domain', 'multiple_hyphens', 'high_digit_ratio', 'high_domain_entropy',
-                    'url_length', 'extremely_long_url', 'suspicious_url_length', 'deep_path', 'long_query',
-                    'path_length', 'query_length', 'keyword_count', 'has_phishing_keywords',
-                    'multiple_phishing_keywords', 'has_brand_impersonation', 'has_suspicious_domain_pattern',
-                    'is_shortener', 'has_at_symbol', 'has_double_slash', 'special_char_density',
-                    'high_special_char_density', 'homograph_risk', 'potential_typosquatting',
-                    'risk_factor_count', 'multiple_critical_risks', 'ultra_high_risk'
-                ]
+                self.feature_list = list(FEATURE_NAMES)
             
             logger.info(f"Final feature list: {len(self.feature_list)} features")
+            if len(self.feature_list) > 1:  # a single-key itemgetter returns a bare value
+                self._feature_getter = itemgetter(*self.feature_list)
             logger.info("Model and related artifacts loaded successfully")
-            self._register_lightweight_model_in_database()
+            self._start_model_registration()
             
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}", exc_info=True)
 
+    def warmup(self):
+        """run one throwaway prediction so the first request doesn't pay for lazy setup"""
+        if self.model is None:
+            return
+        try:
+            # first extraction loads the bundled suffix list and the first scoring
+            # pages in the model arrays; nothing is tracked
+            features = FeatureExtractor.extract_features("https://example.com")
+            X = self._feature_matrix([features]) if self.feature_list else None
+            if X is not None:
+                self._predict_proba(self._scale(X))
+            logger.info("Model warmup complete")
+        except Exception as e:
+            logger.warning(f"Model warmup failed: {str(e)}")
+
+    def _start_model_registration(self):
+        """register the model from a background thread so loading never waits on the web server"""
+        if self._registration_started.is_set():
+            return
+        self._registration_started.set()
+        threading.Thread(
+            target=self._register_lightweight_model_in_database,
+            name="model-registration",
+            daemon=True
+        ).start()
+
     def _register_lightweight_model_in_database(self):
         """register or update the model in the database"""
         try:
@@ -132,6 +181,8 @@ class ModelService:
             logger.error(f"Error registering model in database: {str(e)}")
     
     def predict(self, url: str, features: Dict[str, Any] = None) -> Dict[str, Any]:
+        # per-prediction details log at debug with lazy % args, so nothing is
+        # formatted unless debug logging is on; the router logs the outcome
         try:
             # check if model is loaded
             if self.model is None:
@@ -143,93 +194,235 @@ class ModelService:
                     "probability": 0.0,
                     "details": "Unable to make prediction: Model not loaded",
                     "model_version": self.model_info["version"],
-                    "features_used": []
+                    "error": True
                 }
             
-            # extract features if not provided
-            if features is None:
+            # extract features if not provided, unless this url was scored recently
+            cacheable = features is None
+            if cacheable:
+                cached = self._get_cached_result(url)
+                if cached is not None:
+                    return cached
                 features = FeatureExtractor.extract_features(url)
 
-            logger.info(f"Features extracted: {len(features)} features for URL: {url[:50]}...")
+            logger.debug("Features extracted: %d features for URL: %.50s...", len(features), url)
+
+            if self._has_critical_indicator(features):
+                result = self._build_result(url, features, CRITICAL_OVERRIDE_PROBABILITY, heuristic_override=True)
+                if cacheable:
+                    self._cache_result(url, result)
+                return result
             
             # prepare features for the model using the correct feature list
             if self.feature_list:
-                X = FeatureExtractor.prepare_features_for_model(features, self.feature_list)
-                logger.info(f"Prepared feature array shape: {X.shape} for {len(self.feature_list)} features")
+                X = self._feature_row(features)
+                logger.debug("Prepared feature array shape: %s for %d features", X.shape, len(self.feature_list))
             else:
                 X = np.array(list(features.values())).reshape(1, -1)
                 logger.warning(f"No feature list available, using all {X.shape[1]} features")
             
             # scale features
-            X_scaled = self.scaler.transform(X)
+            X_scaled = self._scale(X)
             
             # get prediction
-            raw_prediction = self.model.predict(X_scaled)[0]
-            raw_probability = float(self.model.predict_proba(X_scaled)[0, 1])
-            
-            logger.info(f"Raw model output: prediction={raw_prediction}, probability={raw_probability:.4f}")
-            
-            PHISHING_THRESHOLD = 0.4  # Lower threshold for maximum security
-            
-            # Apply the threshold
-            is_phishing = raw_probability >= PHISHING_THRESHOLD
-            
-            # Calculate threat score
-            threat_score = int(raw_probability * 100)
-            
-            # Ultra-sensitive override - never miss critical indicators
-            if not is_phishing:
-                if (features.get('has_ip', 0) == 1 or 
-                    features.get('ultra_high_risk', 0) == 1 or
-                    features.get('multiple_critical_risks', 0) == 1):
-                    is_phishing = True
-                    threat_score = max(threat_score, 80)
-                    logger.info("Ultra-sensitive override: Critical phishing indicators detected")
+            raw_probability = float(self._predict_proba(X_scaled)[0, 1])
             
-            logger.info(f"Final decision: is_phishing={is_phishing}, threat_score={threat_score}")
-            
-            # Generate simple details
-            if is_phishing:
-                if threat_score > 85:
-                    details = "HIGH RISK: This URL has a very high probability of being a phishing website."
-                elif threat_score > 60:
-                    details = "PHISHING DETECTED: This URL appears to be a phishing website."
-                else:
-                    details = "SUSPICIOUS: This URL shows characteristics of a phishing website."
-            else:
-                if threat_score > 30:
-                    details = "CAUTION: This URL has some suspicious characteristics but appears legitimate."
-                else:
-                    details = "SAFE: This URL appears to be legitimate."
-            
-            # track the model evaluation in the database if available
-            if hasattr(self, 'db_integration'):
-                self.db_integration.track_lightweight_model_evaluation({
-                    "model_name": self.model_info["name"],
-                    "url": url,
-                    "is_phishing": is_phishing,
-                    "score": threat_score / 100.0
-                })
-            
-            # Return the result
-            return {
-                "url": url,
-                "is_phishing": is_phishing,
-                "threat_score": threat_score,
-                "probability": raw_probability,
-                "details": details,
-                "model_version": self.model_info["version"],
-                "features_used": self.feature_list  
-            }
+            logger.debug("Raw model output: probability=%.4f", raw_probability)
+
+            result = self._build_result(url, features, raw_probability)
+            if cacheable:
+                self._cache_result(url, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error making prediction: {str(e)}", exc_info=True)
-            return {
+            return self._error_result(url)
+
+    def predict_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """predict several (url, features) pairs with a single scaler and model call"""
+        if self.model is None or not self.feature_list or len(items) == 1:
+            # nothing to share between rows, predict handles these cases itself
+            return [self.predict(url, features) for url, features in items]
+
+        # like predict, results are cached for the urls whose features are extracted here
+        cacheable = [features is None for _, features in items]
+        items = [
+            (url, features if features is not None else FeatureExtractor.extract_features(url))
+            for url, features in items
+        ]
+
+        # rows with a critical indicator don't need the model
+        critical = [self._has_critical_indicator(features) for _, features in items]
+        probabilities = [CRITICAL_OVERRIDE_PROBABILITY] * len(items)
+        scored = [i for i, is_critical in enumerate(critical) if not is_critical]
+        if scored:
+            try:
+                X = self._feature_matrix([items[i][1] for i in scored])
+                for i, probability in zip(scored, self._predict_proba(self._scale(X))[:, 1]):
+                    probabilities[i] = float(probability)
+                logger.debug("Batched prediction for %d of %d URLs", len(scored), len(items))
+            except Exception as e:
+                logger.error(f"Error making batched prediction: {str(e)}", exc_info=True)
+                return [self._error_result(url) for url, _ in items]
+
+        results = []
+        for (url, features), raw_probability, is_critical, cache in zip(items, probabilities, critical, cacheable):
+            try:
+                result = self._build_result(url, features, raw_probability, heuristic_override=is_critical)
+                if cache:
+                    self._cache_result(url, result)
+                results.append(result)
+            except Exception as e:
+                logger.error(f"Error making prediction: {str(e)}", exc_info=True)
+                results.append(self._error_result(url))
+        return results
+
+    def predict_batch(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """predict a list of urls, recently scored ones come from the cache and the rest share one model call"""
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for url in dict.fromkeys(urls):
+            cached = self._get_cached_result(url)
+            if cached is not None:
+                results[url] = cached
+            else:
+                pending.append(url)
+
+        if pending:
+            # predict_many extracts the features and caches what it scores
+            fresh = self.predict_many([(url, None) for url in pending])
+            results.update(zip(pending, fresh))
+
+        # duplicates in the request each get their own copy
+        return [dict(results[url]) for url in urls]
+
+    def _get_cached_result(self, url: str) -> Dict[str, Any]:
+        """copy of a fresh cached result for the url, None if there isn't one"""
+        with self._cache_lock:
+            entry = self._cache.get(url)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._cache[url]
+                return None
+            self._cache.move_to_end(url)
+        return dict(result)
+
+    def _cache_result(self, url: str, result: Dict[str, Any]) -> None:
+        with self._cache_lock:
+            self._cache[url] = (time.monotonic() + PREDICT_CACHE_TTL, dict(result))
+            self._cache.move_to_end(url)
+            while len(self._cache) > PREDICT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _predict_proba(self, X_scaled: np.ndarray) -> np.ndarray:
+        if self.forest is not None:
+            return self.forest.predict_proba(X_scaled)
+        return self.model.predict_proba(X_scaled)
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        """standardize model input rows, in place when the scaler parameters are cached"""
+        if self._scaler_mean is None or X.dtype != np.float64 or X.shape[1:] != self._scaler_mean.shape:
+            return self.scaler.transform(X)
+        # the same subtract then divide StandardScaler.transform does, so the
+        # scaled values are identical
+        np.subtract(X, self._scaler_mean, out=X)
+        np.divide(X, self._scaler_scale, out=X)
+        return X
+
+    def _feature_row(self, features: Dict[str, Any]) -> np.ndarray:
+        """single model input row, written into this thread's reusable buffer"""
+        if self._feature_getter is None:
+            return self._feature_matrix([features])
+        buf = getattr(self._tls, 'row', None)
+        if buf is None:
+            # float64 like the batch path, the scaler was fitted on float64 rows
+            buf = self._tls.row = np.empty((1, len(self.feature_list)), dtype=np.float64)
+        try:
+            buf[0] = self._feature_getter(features)
+        except KeyError:
+            return self._feature_matrix([features])
+        return buf
+
+    def _feature_matrix(self, features_batch: List[Dict[str, Any]]) -> np.ndarray:
+        """model input rows in feature_list order, one per feature dict"""
+        if self._feature_getter is not None:
+            try:
+                return np.array([self._feature_getter(features) for features in features_batch], dtype=np.float64)
+            except KeyError:
+                pass  # some dict lacks a feature, fill the gaps with 0 below
+        return FeatureExtractor.prepare_features_batch(features_batch, self.feature_list)
+
+    @staticmethod
+    def _has_critical_indicator(features: Dict[str, Any]) -> bool:
+        return any(features.get(name, 0) == 1 for name in CRITICAL_INDICATORS)
+
+    def _build_result(self, url: str, features: Dict[str, Any], raw_probability: float,
+                      heuristic_override: bool = False) -> Dict[str, Any]:
+        """apply the decision threshold and overrides to a model probability"""
+        PHISHING_THRESHOLD = 0.4  # Lower threshold for maximum security
+        
+        # Apply the threshold
+        is_phishing = raw_probability >= PHISHING_THRESHOLD
+        
+        # Calculate threat score
+        threat_score = int(raw_probability * 100)
+        
+        # Ultra-sensitive override - never miss critical indicators
+        if not is_phishing:
+            if (features.get('has_ip', 0) == 1 or 
+                features.get('ultra_high_risk', 0) == 1 or
+                features.get('multiple_critical_risks', 0) == 1):
+                is_phishing = True
+                threat_score = max(threat_score, 80)
+                logger.debug("Ultra-sensitive override: Critical phishing indicators detected")
+        
+        logger.debug("Final decision: is_phishing=%s, threat_score=%d", is_phishing, threat_score)
+        
+        # Generate simple details
+        if is_phishing:
+            if threat_score > 85:
+                details = "HIGH RISK: This URL has a very high probability of being a phishing website."
+            elif threat_score > 60:
+                details = "PHISHING DETECTED: This URL appears to be a phishing website."
+            else:
+                details = "SUSPICIOUS: This URL shows characteristics of a phishing website."
+        else:
+            if threat_score > 30:
+                details = "CAUTION: This URL has some suspicious characteristics but appears legitimate."
+            else:
+                details = "SAFE: This URL appears to be legitimate."
+        
+        # track the model evaluation in the database if available
+        if hasattr(self, 'db_integration'):
+            self.db_integration.track_lightweight_model_evaluation({
+                "model_name": self.model_info["name"],
                 "url": url,
-                "is_phishing": False,
-                "threat_score": 0,
-                "probability": 0.0,
-                "details": "Error analyzing URL. Please verify manually.",
-                "model_version": self.model_info["version"],
-                "features_used": self.feature_list or []
-            }
\ No newline at end of file
+                "is_phishing": is_phishing,
+                "score": threat_score / 100.0
+            })
+        
+        # Return the result
+        return {
+            "url": url,
+            "is_phishing": is_phishing,
+            "threat_score": threat_score,
+            "probability": raw_probability,
+            "details": details,
+            "model_version": self.model_info["version"],
+            # True when critical indicators decided the result without the model
+            "heuristic_override": heuristic_override
+        }
+
+    def _error_result(self, url: str) -> Dict[str, Any]:
+        return {
+            "url": url,
+            "is_phishing": False,
+            "threat_score": 0,
+            "probability": 0.0,
+            "details": "Error analyzing URL. Please verify manually.",
+            "model_version": self.model_info["version"],
+            # fallback answer, callers must not cache it
+            "error": True
+        }
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..logging_config import get_logger
+from .model_service import ModelService
+
+logger = get_logger(__name__)
+
+# upper bound on rows sent to the model in one call
+MAX_BATCH_SIZE = 64
+
+class PredictionBatcher:
+    """
+    coalesces predictions from concurrent requests into one model call
+    implemented as a singleton so every request shares the same queue
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PredictionBatcher, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.model_service = ModelService()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def predict(self, url: str, features: Dict[str, Any]) -> Dict[str, Any]:
+        """queue a prediction and wait for the batch that includes it"""
+        # the worker is bound to the running loop, start it on first use
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((url, features, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            # no timer: whatever queued up while the previous batch was in the
+            # model goes into the next one, so a lone request isn't delayed
+            batch: List[Tuple[str, Dict[str, Any], asyncio.Future]] = [await self._queue.get()]
+            while len(batch) < MAX_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                # sklearn blocks, keep it off the event loop
+                results = await asyncio.to_thread(
+                    self.model_service.predict_many,
+                    [(url, features) for url, features, _ in batch]
+                )
+            except Exception as e:
+                logger.error(f"Error running prediction batch: {str(e)}", exc_info=True)
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, _, future), result in zip(batch, results):
+                # the request may have been cancelled while it waited
+                if not future.done():
+                    future.set_result(result)
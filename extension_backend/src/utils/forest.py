@@ -0,0 +1,86 @@
+import numpy as np
+from typing import Any, Optional
+
+from ..logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class FlatForest:
+    """
+    sklearn random forest flattened into plain node arrays
+    every tree is walked at once with numpy, one level per step, which skips the
+    per-tree python dispatch and input validation of RandomForestClassifier.predict_proba
+    """
+
+    def __init__(self, model: Any):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        self.n_trees = len(trees)
+        self.n_features = model.n_features_in_
+
+        # node arrays of all trees back to back, roots at each tree's offset
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            node_ids = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+            # leaves point back at themselves, so extra steps for shallow trees are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+            # class probabilities per node, normalized the same way as
+            # DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].copy()
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer[:, np.newaxis])
+
+        self.roots = offsets.astype(np.intp)
+        self.features = np.concatenate(features).astype(np.intp)
+        self.thresholds = self._float32_thresholds(np.concatenate(thresholds))
+        self.lefts = np.concatenate(lefts).astype(np.intp)
+        self.rights = np.concatenate(rights).astype(np.intp)
+        self.values = np.concatenate(values)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    @staticmethod
+    def _float32_thresholds(thresholds: np.ndarray) -> np.ndarray:
+        """
+        float32 thresholds that split float32 inputs exactly like the float64 ones
+        for a float32 x, x <= t holds exactly when x <= the largest float32 not above t,
+        so round every threshold down and the decisions stay the same at half the size
+        """
+        rounded = thresholds.astype(np.float32)
+        above = rounded.astype(np.float64) > thresholds
+        rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+        return rounded
+
+    @classmethod
+    def from_model(cls, model: Any) -> Optional["FlatForest"]:
+        """flatten a fitted single-output sklearn forest, None for anything else"""
+        try:
+            if getattr(model, 'n_outputs_', None) != 1 or not hasattr(model, 'estimators_'):
+                return None
+            return cls(model)
+        except Exception as e:
+            logger.warning(f"Could not flatten model, using sklearn prediction: {str(e)}")
+            return None
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """same (n_samples, n_classes) probabilities as the forest's predict_proba"""
+        # sklearn trees compare float32 inputs, thresholds are rounded to match
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.tile(self.roots, (X.shape[0], 1))
+        for _ in range(self.depth):
+            go_left = X[rows, self.features[nodes]] <= self.thresholds[nodes]
+            nodes = np.where(go_left, self.lefts[nodes], self.rights[nodes])
+
+        # add tree by tree in order like the sklearn accumulation, then average
+        return np.cumsum(self.values[nodes], axis=1)[:, -1] / self.n_trees
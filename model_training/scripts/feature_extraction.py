@@ -1,19 +1,69 @@
 import re
 import numpy as np
+from collections import Counter
+from operator import itemgetter
 from urllib.parse import urlparse
 
+# compiled once instead of per call
+_IP_RE = re.compile(r'\d+\.\d+\.\d+\.\d+')
+
+# characters counted by num_special_chars; translate drops them all in one C
+# pass, so the count is just the length difference
+SPECIAL_CHARS = "!@#$%^&*()_+-=[]{}|;:,<>?/"
+_DROP_SPECIAL_CHARS = str.maketrans('', '', SPECIAL_CHARS)
+
+# plain http(s) urls split straight into netloc and path. anything urlparse would
+# treat specially (whitespace and control chars it strips, ';' params, '[' ipv6
+# brackets, non-ascii netloc checks) takes the urlparse route instead
+_HTTP_URL_RE = re.compile(r'(?i:https?)://([^/?#]*)([^?#]*)')
+_URLPARSE_ONLY_RE = re.compile(r'[\x00-\x20;\[\]\x7f]')
+
+# common phishing tlds, a tuple so endswith checks them all in one call
+SUSPICIOUS_TLDS = ('.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.club')
+
+# keywords counted by suspicious_keywords
+SUSPICIOUS_KEYWORDS = ('secure', 'account', 'webscr', 'login', 'signin', 'verify', 'banking')
+
+# common url shorteners, matched anywhere in the url with one alternation scan
+URL_SHORTENERS = ('bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'is.gd', 'cli.gs', 'ow.ly')
+_SHORTENER_RE = re.compile('|'.join(map(re.escape, URL_SHORTENERS)))
+
 class FeatureExtractor:
     """
     Utility class to extract features from URLs for phishing detection
     """
     
     @staticmethod
-    def extract_lightweight_features(url):
+    def split_url(url):
+        """
+        Split a URL into domain and path, shared by both feature sets
+        
+        Args:
+            url (str): The URL to split
+            
+        Returns:
+            tuple: (domain, path)
+        """
+        try:
+            if url.isascii() and not _URLPARSE_ONLY_RE.search(url):
+                match = _HTTP_URL_RE.match(url)
+                if match:
+                    return match.group(1), match.group(2)
+            parsed = urlparse(url)
+            return parsed.netloc, parsed.path
+        except:
+            domain = url.split('/')[0] if '/' in url else url
+            path = '/'.join(url.split('/')[1:]) if '/' in url else ''
+            return domain, path
+    
+    @staticmethod
+    def extract_lightweight_features(url, url_parts=None):
         """
         Extract lightweight features suitable for browser extension
         
         Args:
             url (str): The URL to analyze
+            url_parts (tuple, optional): (domain, path) from split_url if already parsed
             
         Returns:
             dict: Dictionary of extracted features
@@ -27,22 +77,16 @@ class FeatureExtractor:
         features['num_dots'] = url.count('.')
         
         # Number of special characters (!@#$%^&*()_+)
-        features['num_special_chars'] = sum(c in "!@#$%^&*()_+-=[]{}|;:,<>?/" for c in url)
+        features['num_special_chars'] = len(url) - len(url.translate(_DROP_SPECIAL_CHARS))
         
         # Presence of IP address (simple check for 4 numbers separated by dots)
-        features['has_ip'] = 1 if bool(re.search(r'\d+\.\d+\.\d+\.\d+', url)) else 0
+        features['has_ip'] = 1 if _IP_RE.search(url) else 0
         
         # Presence of @ symbol
         features['has_at_symbol'] = 1 if '@' in url else 0
         
         # Get domain and path
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc
-            path = parsed.path
-        except:
-            domain = url.split('/')[0] if '/' in url else url
-            path = '/'.join(url.split('/')[1:]) if '/' in url else ''
+        domain, path = url_parts if url_parts is not None else FeatureExtractor.split_url(url)
         
         # Number of subdomains
         subdomain_count = len(domain.split('.')) - 1 if domain else 0
@@ -55,8 +99,7 @@ class FeatureExtractor:
         features['has_hyphen'] = 1 if '-' in domain else 0
         
         # URL shortener detection (common URL shorteners)
-        url_shorteners = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'is.gd', 'cli.gs', 'ow.ly']
-        features['is_shortened'] = 1 if any(shortener in url for shortener in url_shorteners) else 0
+        features['is_shortened'] = 1 if _SHORTENER_RE.search(url) else 0
         
         return features
     
@@ -72,27 +115,21 @@ class FeatureExtractor:
         Returns:
             dict: Dictionary of extracted features
         """
+        # Get domain and path once for both feature sets
+        url_parts = FeatureExtractor.split_url(url)
+        domain, path = url_parts
+        
         # Start with lightweight features
-        features = FeatureExtractor.extract_lightweight_features(url)
+        features = FeatureExtractor.extract_lightweight_features(url, url_parts)
         
         # Need to all the features
-        
-        # Get domain and path
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc
-            path = parsed.path
-        except:
-            domain = url.split('/')[0] if '/' in url else url
-            path = '/'.join(url.split('/')[1:]) if '/' in url else ''
             
         # Suspicious TLD - Common phishing TLDs
-        suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.club']
-        features['suspicious_tld'] = 1 if any(domain.endswith(tld) for tld in suspicious_tlds) else 0
+        features['suspicious_tld'] = 1 if domain.endswith(SUSPICIOUS_TLDS) else 0
         
         # Suspicious keywords in URL
-        suspicious_keywords = ['secure', 'account', 'webscr', 'login', 'signin', 'verify', 'banking']
-        features['suspicious_keywords'] = sum(keyword in url.lower() for keyword in suspicious_keywords)
+        url_lower = url.lower()
+        features['suspicious_keywords'] = sum(keyword in url_lower for keyword in SUSPICIOUS_KEYWORDS)
         
         # URL entropy (measure of randomness, higher in phishing URLs)
         def calculate_entropy(text):
@@ -100,8 +137,10 @@ class FeatureExtractor:
             if not text:
                 return 0
             text = text.lower()
-            p, counts = np.unique(list(text), return_counts=True)
-            return -sum(count/len(text) * np.log2(count/len(text)) for count in counts)
+            # one C-level histogram, then log2 of all counts at once
+            counts = np.fromiter(Counter(text).values(), dtype=np.float64)
+            probabilities = counts / len(text)
+            return float(-(probabilities * np.log2(probabilities)).sum())
         
         features['url_entropy'] = calculate_entropy(domain)
         
@@ -120,6 +159,36 @@ class FeatureExtractor:
         
         return features
 
+    @staticmethod
+    def extract_feature_matrix(urls, comprehensive=False):
+        """
+        Extract features for many URLs straight into one model input matrix
+        
+        Args:
+            urls (list): The URLs to analyze
+            comprehensive (bool): Use the comprehensive feature set instead of the lightweight one
+            
+        Returns:
+            tuple: (matrix of shape (len(urls), n_features), list of feature names in column order)
+        """
+        extract = (FeatureExtractor.extract_comprehensive_features if comprehensive
+                   else FeatureExtractor.extract_lightweight_features)
+        if not urls:
+            return np.empty((0, 0)), []
+        
+        # every url yields the same keys, so the first one fixes the column order
+        first = extract(urls[0])
+        feature_names = list(first)
+        row_values = itemgetter(*feature_names)
+        
+        # rows are written into one preallocated array instead of stacking
+        # a list of per-url vectors at the end
+        X = np.empty((len(urls), len(feature_names)), dtype=np.float64)
+        X[0] = row_values(first)
+        for i in range(1, len(urls)):
+            X[i] = row_values(extract(urls[i]))
+        return X, feature_names
+
 if __name__ == "__main__":
     urls = [
         "https://www.google.com",
@@ -1,18 +1,63 @@
 import os
 import sys
+import csv
 import json
+import pickle
 import numpy as np
 import pandas as pd
+import matplotlib
+# figures are only ever written to files, no display backend needed
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 from pathlib import Path
 import joblib
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from sklearn.tree import DecisionTreeClassifier, ExtraTreeClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, roc_curve, auc, classification_report
 import prisma
 from prisma.models import MLModel
 
-def evaluate_model(model, X_test, y_test, model_name, output_dir):
+# classifiers whose predict() is exactly classes_[argmax(predict_proba)]
+ARGMAX_PROBA_CLASSIFIERS = (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier, ExtraTreeClassifier)
+
+def binary_confusion_matrix(y_true, y_pred):
+    """
+    Args:
+        y_true: True labels
+        y_pred: Predicted labels
+        
+    Returns:
+        2x2 array [[tn, fp], [fn, tp]] for 0/1 labels, None for any other labels
+    """
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    if (y_true.dtype.kind in "biu" and y_pred.dtype.kind in "biu"
+            and np.all((y_true == 0) | (y_true == 1)) and np.all((y_pred == 0) | (y_pred == 1))):
+        # each (true, predicted) pair becomes one of the codes 0-3, counted in one C pass
+        codes = 2 * y_true.astype(np.intp) + y_pred.astype(np.intp)
+        return np.bincount(codes, minlength=4).reshape(2, 2)
+    return None
+
+def metrics_from_confusion_matrix(cm):
+    """
+    Args:
+        cm: 2x2 confusion matrix [[tn, fp], [fn, tp]]
+        
+    Returns:
+        tuple: (accuracy, precision, recall, f1) with the same formulas and
+        zero-division results (0.0) as the sklearn scores
+    """
+    tn, fp, fn, tp = (int(count) for count in cm.ravel())
+    total = tn + fp + fn + tp
+    accuracy = (tp + tn) / total if total else 0.0
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0
+    return accuracy, precision, recall, f1
+
+def evaluate_model(model, X_test, y_test, model_name, output_dir, make_plots=True):
     """
     Args:
         model: The trained scikit-learn model
@@ -20,26 +65,44 @@ def evaluate_model(model, X_test, y_test, model_name, output_dir):
         y_test: Test labels
         model_name: Name of the model
         output_dir: Directory to save evaluation results
+        make_plots: Render the PNG charts, False writes only the metrics and importances
     """
 
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
     # Make predictions
-    y_pred = model.predict(X_test)
-    if hasattr(model, "predict_proba"):
-        y_pred_proba = model.predict_proba(X_test)[:, 1]
+    if isinstance(model, ARGMAX_PROBA_CLASSIFIERS):
+        # these models predict the class with the highest probability, so one
+        # predict_proba pass gives both instead of walking every tree twice
+        proba = model.predict_proba(X_test)
+        y_pred_proba = proba[:, 1]
+        y_pred = model.classes_.take(np.argmax(proba, axis=1))
     else:
-        y_pred_proba = model.decision_function(X_test)
+        y_pred = model.predict(X_test)
+        if hasattr(model, "predict_proba"):
+            y_pred_proba = model.predict_proba(X_test)[:, 1]
+        else:
+            y_pred_proba = model.decision_function(X_test)
     
-    # Calculate metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
+    # Convert the labels once instead of in every metric call, 0/1 labels fit in int8
+    y_true = np.ascontiguousarray(y_test)
+    if y_true.dtype.kind in "biu" and np.all((y_true == 0) | (y_true == 1)):
+        y_true = y_true.astype(np.int8)
+    
+    # Calculate metrics - all four come from the confusion matrix counts for 0/1 labels
+    cm = binary_confusion_matrix(y_true, y_pred)
+    if cm is not None:
+        accuracy, precision, recall, f1 = metrics_from_confusion_matrix(cm)
+    else:
+        accuracy = accuracy_score(y_true, y_pred)
+        precision = precision_score(y_true, y_pred)
+        recall = recall_score(y_true, y_pred)
+        f1 = f1_score(y_true, y_pred)
+        cm = confusion_matrix(y_true, y_pred)
     
     # ROC curve and AUC
-    fpr, tpr, _ = roc_curve(y_test, y_pred_proba)
+    fpr, tpr, _ = roc_curve(y_true, y_pred_proba)
     roc_auc = auc(fpr, tpr)
     
     # Compile metrics
@@ -57,44 +120,58 @@ def evaluate_model(model, X_test, y_test, model_name, output_dir):
     with open(f"{output_dir}/{model_name}_metrics.json", "w") as f:
         json.dump(metrics, f, indent=2)
     
-    # Plot confusion matrix
-    plt.figure(figsize=(8, 6))
-    cm = confusion_matrix(y_test, y_pred)
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title(f'Confusion Matrix - {model_name}')
-    plt.ylabel('True Label')
-    plt.xlabel('Predicted Label')
-    plt.savefig(f"{output_dir}/{model_name}_confusion_matrix.png")
-    
-    # Plot ROC curve
-    plt.figure(figsize=(8, 6))
-    plt.plot(fpr, tpr, color='blue', lw=2, label=f'ROC curve (area = {roc_auc:.2f})')
-    plt.plot([0, 1], [0, 1], color='gray', lw=2, linestyle='--')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title(f'ROC Curve - {model_name}')
-    plt.legend(loc="lower right")
-    plt.savefig(f"{output_dir}/{model_name}_roc_curve.png")
+    if make_plots:
+        # Plot confusion matrix
+        plt.figure(figsize=(8, 6))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
+        plt.title(f'Confusion Matrix - {model_name}')
+        plt.ylabel('True Label')
+        plt.xlabel('Predicted Label')
+        plt.savefig(f"{output_dir}/{model_name}_confusion_matrix.png")
+        plt.close()
+        
+        # Plot ROC curve - on large test sets the curve has far more points than the
+        # image has pixels, so draw it resampled (the AUC above uses the full curve)
+        plot_fpr, plot_tpr = fpr, tpr
+        if len(fpr) > 2000:
+            plot_fpr = np.linspace(0.0, 1.0, 1000)
+            plot_tpr = np.interp(plot_fpr, fpr, tpr)
+        plt.figure(figsize=(8, 6))
+        plt.plot(plot_fpr, plot_tpr, color='blue', lw=2, label=f'ROC curve (area = {roc_auc:.2f})')
+        plt.plot([0, 1], [0, 1], color='gray', lw=2, linestyle='--')
+        plt.xlim([0.0, 1.0])
+        plt.ylim([0.0, 1.05])
+        plt.xlabel('False Positive Rate')
+        plt.ylabel('True Positive Rate')
+        plt.title(f'ROC Curve - {model_name}')
+        plt.legend(loc="lower right")
+        plt.savefig(f"{output_dir}/{model_name}_roc_curve.png")
+        plt.close()
     
     # Plot feature importance (this is only if it available)
     if hasattr(model, "feature_importances_"):
-        feature_names = X_test.columns if hasattr(X_test, "columns") else [f"feature_{i}" for i in range(X_test.shape[1])]
-        feature_importances = pd.DataFrame({
-            "feature": feature_names,
-            "importance": model.feature_importances_
-        }).sort_values("importance", ascending=False)
+        feature_names = np.asarray(X_test.columns if hasattr(X_test, "columns") else [f"feature_{i}" for i in range(X_test.shape[1])])
+        # forests recompute feature_importances_ over every tree on each access, read it once
+        importances = np.asarray(model.feature_importances_)
+        order = np.argsort(-importances, kind="stable")
+        sorted_names = feature_names[order]
+        sorted_importances = importances[order]
         
-        # Save feature importances
-        feature_importances.to_csv(f"{output_dir}/{model_name}_feature_importances.csv", index=False)
+        # Save feature importances - written straight from the sorted arrays, csv
+        # quotes and formats floats the same way DataFrame.to_csv does
+        with open(f"{output_dir}/{model_name}_feature_importances.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("feature", "importance"))
+            writer.writerows(zip(sorted_names.tolist(), sorted_importances.tolist()))
         
         # Plot top 20 features
-        plt.figure(figsize=(10, 8))
-        sns.barplot(x="importance", y="feature", data=feature_importances.head(20))
-        plt.title(f'Top 20 Feature Importances - {model_name}')
-        plt.tight_layout()
-        plt.savefig(f"{output_dir}/{model_name}_feature_importances.png")
+        if make_plots:
+            plt.figure(figsize=(10, 8))
+            sns.barplot(x=sorted_importances[:20], y=sorted_names[:20])
+            plt.title(f'Top 20 Feature Importances - {model_name}')
+            plt.tight_layout()
+            plt.savefig(f"{output_dir}/{model_name}_feature_importances.png")
+            plt.close()
     
     return metrics
 
@@ -109,12 +186,13 @@ def export_model_for_production(model, scaler, feature_list, model_name, output_
     """
     os.makedirs(output_dir, exist_ok=True)
     
-    # Save the model
-    joblib.dump(model, f"{output_dir}/{model_name}.pkl")
+    # Save the model - zlib level 3 shrinks the tree arrays a lot for little cost,
+    # joblib.load decompresses it transparently
+    joblib.dump(model, f"{output_dir}/{model_name}.pkl", compress=3, protocol=pickle.HIGHEST_PROTOCOL)
     
     # Save the scaler
     if scaler is not None:
-        joblib.dump(scaler, f"{output_dir}/{model_name}_scaler.pkl")
+        joblib.dump(scaler, f"{output_dir}/{model_name}_scaler.pkl", compress=3, protocol=pickle.HIGHEST_PROTOCOL)
     
     # Save feature list
     with open(f"{output_dir}/{model_name}_features.json", "w") as f:
@@ -136,6 +214,13 @@ except:
 with open("{model_name}_features.json", "r") as f:
     features = json.load(f)
 
+# StandardScaler parameters, so predict_url can scale with plain numpy
+scaler_mean = scaler_scale = None
+if (scaler is not None and getattr(scaler, "with_mean", False) and getattr(scaler, "with_std", False)
+        and getattr(scaler, "mean_", None) is not None and getattr(scaler, "scale_", None) is not None):
+    scaler_mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scaler_scale = np.asarray(scaler.scale_, dtype=np.float64)
+
 def predict_url(url_features):
     \"\"\"
     Make a prediction on URL features
@@ -146,19 +231,19 @@ def predict_url(url_features):
     Returns:
         dict: Prediction results
     \"\"\"
-    # Prepare feature vector
-    feature_vector = []
-    for feature in features:
-        if feature in url_features:
-            feature_vector.append(url_features[feature])
-        else:
-            feature_vector.append(0)  # Default value if feature is missing
-    
-    # Convert to numpy array
-    X = np.array(feature_vector).reshape(1, -1)
+    # Build the feature vector straight into a numpy array, 0 if a feature is missing
+    X = np.fromiter(
+        (url_features.get(feature, 0) for feature in features),
+        dtype=np.float64,
+        count=len(features)
+    ).reshape(1, -1)
     
-    # Scale features if a scaler is available
-    if scaler is not None:
+    # Scale features if a scaler is available - the same subtract then divide as
+    # StandardScaler.transform, done in place without the sklearn input checks
+    if scaler_mean is not None:
+        np.subtract(X, scaler_mean, out=X)
+        np.divide(X, scaler_scale, out=X)
+    elif scaler is not None:
         X = scaler.transform(X)
     
     # Make prediction
@@ -170,11 +255,11 @@ def predict_url(url_features):
     else:
         probability = float(model.decision_function(X)[0])
     
-    return {
+    return {{
         "is_phishing": is_phishing,
         "phishing_probability": probability,
         "suspicious_score": probability * 100  # Convert to 0-100 scale
-    }
+    }}
 """
     
     with open(f"{output_dir}/{model_name}_inference.py", "w") as f: